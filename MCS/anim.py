@@ -4,14 +4,25 @@ from matplotlib.animation import FuncAnimation
 from PIL import Image
 import random
 import time
-import requests
+import os
+import sys
+import threading
 import json
 from scipy.stats import gaussian_kde
-from scipy.interpolate import griddata
 import pickle
-import csv
-from numba import jit, njit
+from numba import jit, njit, prange, cuda
+from numba.cuda.random import create_xoroshiro128p_states, xoroshiro128p_uniform_float32
+import math
 from scipy.ndimage import map_coordinates
+try:
+    # OpenGL point rendering for the live animation; matplotlib is the fallback
+    from vispy import app as vispy_app, scene
+except ImportError:
+    scene = None
+from .elevation import (
+    ELEVATION_TILE_DIR, SENSE_WATER, SENSE_ROAD, SENSE_ELEVATION, SENSE_FLAT,
+    fetch_elevation_samples, sensing_map, sobel_gradient
+)
 
 # Configuration
 FPS = 30
@@ -23,103 +34,105 @@ ELEVATION_PREFERENCE = 0.65
 AGE_RANGE = (0.1, 1.0)
 AGE_SPEED_FACTOR = 2.0
 SENSING_RADIUS = 3
+CUDA_THREADS_PER_BLOCK = 128
 
 # Pre-computed terrain colors as numpy arrays
-TERRAIN_COLORS_ARRAY = np.array([
+TERRAIN_COLORS_RGB = np.array([
     [144, 238, 144],  # sparse_forest
     [0, 100, 0],      # dense_forest  
     [0, 102, 204],    # water
     [51, 51, 51]      # road
-]) / 255.0
+], dtype=np.int32)
 
-TERRAIN_NAMES = ['sparse_forest', 'dense_forest', 'water', 'road']
+# Bot colors by age band (young, middle, old), three shades each
+BOT_AGE_BANDS = [0.4, 0.7]
+BOT_COLOR_PALETTE = np.array([
+    [[1.0, 0.0, 0.0], [1.0, 0.5, 0.0], [1.0, 1.0, 0.0]],
+    [[0.8, 0.2, 0.2], [0.8, 0.4, 0.1], [0.7, 0.7, 0.2]],
+    [[0.6, 0.3, 0.3], [0.6, 0.4, 0.2], [0.5, 0.5, 0.3]]
+], dtype=np.float32)
 
-@njit
-def fast_closest_terrain(pixel_rgb):
-    min_dist = 999.0
-    closest_idx = 0
-    for i in range(4):
-        dist = 0.0
-        for j in range(3):
-            diff = pixel_rgb[j] - TERRAIN_COLORS_ARRAY[i, j]
-            dist += diff * diff
-        if dist < min_dist:
-            min_dist = dist
-            closest_idx = i
-    return closest_idx
+TERRAIN_NAMES = ['sparse_forest', 'dense_forest', 'water', 'road']
 
-@njit
-def update_bots_vectorized(bot_positions, bot_angles, bot_speeds, bot_ages, 
-                          terrain_map, elevation_data, elevation_gradients,
-                          width, height, sensing_radius, elevation_preference):
-    n_bots = len(bot_positions)
-    for i in range(n_bots):
-        x, y = bot_positions[i]
-        x_int = max(0, min(width - 1, int(x)))
-        y_int = max(0, min(height - 1, int(y)))
-        x_min = max(0, x_int - sensing_radius)
-        x_max = min(width, x_int + sensing_radius + 1)
-        y_min = max(0, y_int - sensing_radius)  
-        y_max = min(height, y_int + sensing_radius + 1)
-        water_count = 0
-        road_count = 0
-        total_pixels = 0
-        for yi in range(y_min, y_max):
-            for xi in range(x_min, x_max):
-                terrain_type = terrain_map[yi, xi]
-                total_pixels += 1
-                if terrain_type == 2:
-                    water_count += 1
-                elif terrain_type == 3:
-                    road_count += 1
+# Explicit signature: compiled eagerly (and cached to disk) for the SoA float32 layout
+@njit('void(f4[::1], f4[::1], f4[::1], f4[::1], f4[::1], u1[:, ::1], '
+      'f4[:, ::1], i8, i8, f8, f4[:, ::1])',
+      parallel=True, fastmath=True, boundscheck=False, cache=True, nogil=True)
+def update_bots_vectorized(bot_x, bot_y, bot_angles, bot_speeds, bot_ages,
+                          sense_map, target_angle_map,
+                          width, height, elevation_preference, rand_buf):
+    # rand_buf is (n_bots, 3) uniforms drawn outside the kernel so iterations stay independent
+    n_bots = bot_x.shape[0]
+    for i in prange(n_bots):
+        x_int = max(0, min(width - 1, int(bot_x[i])))
+        y_int = max(0, min(height - 1, int(bot_y[i])))
         age_factor = bot_ages[i]
         angle_adjust_factor = 1.0 - (age_factor * 0.3)
         age_elev_pref = elevation_preference * (1.0 + (age_factor - 0.5) * 0.2)
         age_elev_pref = max(0.1, min(0.9, age_elev_pref))
         angle_adjust = 0.0
-        if water_count > 0 and water_count < total_pixels * 0.8:
-            if random.random() < 0.6:
-                angle_adjust += np.random.uniform(-0.5, 0.5) * angle_adjust_factor
-        elif road_count > water_count:
+        # The terrain reaction depends only on the pixel, so it is one byte lookup
+        sense = sense_map[y_int, x_int]
+        if sense == SENSE_WATER:
+            if rand_buf[i, 0] < 0.6:
+                angle_adjust += (rand_buf[i, 1] - 0.5) * angle_adjust_factor
+        elif sense == SENSE_ROAD:
             angle_adjust += 0.3 * angle_adjust_factor
-        elif random.random() < age_elev_pref:
-            grad_x = elevation_gradients[y_int, x_int, 0]
-            grad_y = elevation_gradients[y_int, x_int, 1]
-            if abs(grad_x) > 0.1 or abs(grad_y) > 0.1:
-                target_angle = np.arctan2(-grad_y, -grad_x)
-                angle_diff = target_angle - bot_angles[i]
-                while angle_diff > np.pi:
-                    angle_diff -= 2 * np.pi
-                while angle_diff < -np.pi:
-                    angle_diff += 2 * np.pi
-                angle_adjust = angle_diff * 0.3 * angle_adjust_factor
-        random_component = np.random.uniform(-0.03, 0.03) * (1.0 - age_factor * 0.5)
-        bot_angles[i] += angle_adjust + random_component
-        bot_positions[i, 0] += np.cos(bot_angles[i]) * bot_speeds[i]
-        bot_positions[i, 1] += np.sin(bot_angles[i]) * bot_speeds[i]
-        if bot_positions[i, 0] < 0:
-            bot_positions[i, 0] = width + bot_positions[i, 0]
-        elif bot_positions[i, 0] >= width:
-            bot_positions[i, 0] = bot_positions[i, 0] - width
-        if bot_positions[i, 1] < 0:
-            bot_positions[i, 1] = height + bot_positions[i, 1] 
-        elif bot_positions[i, 1] >= height:
-            bot_positions[i, 1] = bot_positions[i, 1] - height
+        elif sense == SENSE_ELEVATION and rand_buf[i, 0] < age_elev_pref:
+            angle_diff = target_angle_map[y_int, x_int] - bot_angles[i]
+            # Constant-time wrap into [-pi, pi)
+            angle_diff -= 2.0 * math.pi * math.floor((angle_diff + math.pi) / (2.0 * math.pi))
+            angle_adjust = angle_diff * 0.3 * angle_adjust_factor
+        random_component = (rand_buf[i, 2] * 0.06 - 0.03) * (1.0 - age_factor * 0.5)
+        angle = bot_angles[i] + angle_adjust + random_component
+        bot_angles[i] = angle
+        x = bot_x[i] + math.cos(angle) * bot_speeds[i]
+        y = bot_y[i] + math.sin(angle) * bot_speeds[i]
+        # Branchless toroidal wrap
+        x = x - width * math.floor(x / width)
+        y = y - height * math.floor(y / height)
+        bot_x[i] = x
+        bot_y[i] = y
+
+@cuda.jit
+def update_bots_gpu(bot_x, bot_y, bot_angles, bot_speeds, bot_ages,
+                    sense_map, target_angle_map,
+                    width, height, elevation_preference, rng_states):
+    i = cuda.grid(1)
+    if i >= bot_x.shape[0]:
+        return
+    x_int = max(0, min(width - 1, int(bot_x[i])))
+    y_int = max(0, min(height - 1, int(bot_y[i])))
+    age_factor = bot_ages[i]
+    angle_adjust_factor = 1.0 - (age_factor * 0.3)
+    age_elev_pref = elevation_preference * (1.0 + (age_factor - 0.5) * 0.2)
+    age_elev_pref = max(0.1, min(0.9, age_elev_pref))
+    roll = xoroshiro128p_uniform_float32(rng_states, i)
+    angle_adjust = 0.0
+    sense = sense_map[y_int, x_int]
+    if sense == SENSE_WATER:
+        if roll < 0.6:
+            angle_adjust += (xoroshiro128p_uniform_float32(rng_states, i) - 0.5) * angle_adjust_factor
+    elif sense == SENSE_ROAD:
+        angle_adjust += 0.3 * angle_adjust_factor
+    elif sense == SENSE_ELEVATION and roll < age_elev_pref:
+        angle_diff = target_angle_map[y_int, x_int] - bot_angles[i]
+        # Constant-time wrap into [-pi, pi)
+        angle_diff -= 2.0 * math.pi * math.floor((angle_diff + math.pi) / (2.0 * math.pi))
+        angle_adjust = angle_diff * 0.3 * angle_adjust_factor
+    random_component = (xoroshiro128p_uniform_float32(rng_states, i) * 0.06 - 0.03) * (1.0 - age_factor * 0.5)
+    angle = bot_angles[i] + angle_adjust + random_component
+    bot_angles[i] = angle
+    x = bot_x[i] + math.cos(angle) * bot_speeds[i]
+    y = bot_y[i] + math.sin(angle) * bot_speeds[i]
+    # Branchless toroidal wrap
+    x = x - width * math.floor(x / width)
+    y = y - height * math.floor(y / height)
+    bot_x[i] = x
+    bot_y[i] = y
 
 def fetch_elevation_data_cached(lat_center, lon_center, width_pixels, height_pixels, 
-                               resolution_meters=30, cache_file=None):
-    if cache_file:
-        try:
-            cached_data = np.load(cache_file, allow_pickle=True).item()
-            if (cached_data['lat_center'] == lat_center and 
-                cached_data['lon_center'] == lon_center and
-                cached_data['width'] == width_pixels and
-                cached_data['height'] == height_pixels):
-                print("Using cached elevation data")
-                return cached_data['elevation']
-        except:
-            print("No valid cache found, fetching new data")
-    print("Fetching elevation data...")
+                               resolution_meters=30, cache_dir=ELEVATION_TILE_DIR):
     grid_resolution = max(2, min(width_pixels, height_pixels) // 25)
     lat_per_meter = 1 / 111000
     lon_per_meter = 1 / (111000 * np.cos(np.radians(lat_center)))
@@ -133,161 +146,235 @@ def fetch_elevation_data_cached(lat_center, lon_center, width_pixels, height_pix
     lon_max = lon_center + lon_span / 2
     lats = np.linspace(lat_max, lat_min, height_pixels // grid_resolution)
     lons = np.linspace(lon_min, lon_max, width_pixels // grid_resolution)
-    elevation_points, locations = [], []
-    for i, lat in enumerate(lats):
-        for j, lon in enumerate(lons):
-            locations.append(f"{lat},{lon}")
-            elevation_points.append((j * grid_resolution, i * grid_resolution))
-    batch_size = 200  
-    all_elevations = []
-    for i in range(0, len(locations), batch_size):
-        batch = locations[i:i+batch_size]
-        url = f"https://api.open-elevation.com/api/v1/lookup?locations={'|'.join(batch)}"
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                elevations = [result['elevation'] for result in data['results']]
-                all_elevations.extend(elevations)
-                print(f"Fetched batch {i//batch_size + 1}")
-                time.sleep(0.3)
-            else:
-                all_elevations.extend(np.random.uniform(0, 100, len(batch)))
-        except:
-            all_elevations.extend(np.random.uniform(0, 100, len(batch)))
-    if len(all_elevations) == len(elevation_points):
-        x_coords = [pt[0] for pt in elevation_points]
-        y_coords = [pt[1] for pt in elevation_points]
-        xi, yi = np.arange(width_pixels), np.arange(height_pixels)
-        xi_grid, yi_grid = np.meshgrid(xi, yi)
-        elevation_grid = griddata(
-            (x_coords, y_coords),
-            all_elevations,
-            (xi_grid, yi_grid),
-            method='linear',
-            fill_value=np.mean(all_elevations)
-        )
-        if cache_file:
-            cache_data = {
-                'lat_center': lat_center,
-                'lon_center': lon_center,
-                'width': width_pixels,
-                'height': height_pixels,
-                'elevation': elevation_grid
-            }
-            np.save(cache_file, cache_data)
-            print(f"Cached elevation data to {cache_file}")
-        print(f"Elevation range: {np.min(elevation_grid):.1f}–{np.max(elevation_grid):.1f} m")
-        return elevation_grid
-    print("Using random elevation fallback")
-    return np.random.uniform(0, 100, (height_pixels, width_pixels))
+    # Points are cached in the shared per-tile store, so a shifted or resized
+    # view only downloads the samples it has not seen yet
+    elev_grid_coarse = fetch_elevation_samples(lats, lons, cache_dir=cache_dir)
+    # Samples sit on a regular grid every grid_resolution pixels, so a
+    # bilinear resample replaces scattered-data triangulation
+    yy, xx = np.mgrid[0:height_pixels, 0:width_pixels].astype(np.float32)
+    elevation_grid = map_coordinates(
+        elev_grid_coarse,
+        [yy / grid_resolution, xx / grid_resolution],
+        order=1,
+        mode='nearest'
+    )
+    print(f"Elevation range: {np.min(elevation_grid):.1f}–{np.max(elevation_grid):.1f} m")
+    return elevation_grid
 
 class OptimizedSwarmBot:
-    def __init__(self, num_bots, image_path='image.png', lat_center=40.7128, lon_center=-74.0060):
+    def __init__(self, num_bots, image_path='image.png', lat_center=40.7128, lon_center=-74.0060,
+                 backend='cpu'):
         self.image = Image.open(image_path).convert('RGB')
         self.width, self.height = self.image.size
         self.background = np.array(self.image)
         self.num_bots = num_bots
         print("Classifying terrain...")
         self.terrain_map = self._classify_terrain_vectorized()
-        cache_file = f"elevation_cache_{lat_center}_{lon_center}_{self.width}x{self.height}.npy"
         self.elevation_data = fetch_elevation_data_cached(
-            lat_center, lon_center, self.width, self.height, cache_file=cache_file
+            lat_center, lon_center, self.width, self.height
         )
         print("Computing elevation gradients...")
-        gy, gx = np.gradient(self.elevation_data)
-        self.elevation_gradients = np.stack([gx, gy], axis=-1)
-        self.bot_positions = np.zeros((self.num_bots, 2))
-        self.bot_angles = np.zeros(self.num_bots)
-        self.bot_speeds = np.zeros(self.num_bots)
-        self.bot_ages = np.zeros(self.num_bots)
-        self.bot_colors = []
+        gy, gx = sobel_gradient(self.elevation_data)
+        # The downhill direction and whether the slope is worth following never
+        # change, so the kernel reads them instead of recomputing atan2 per frame
+        self.target_angle_map = np.arctan2(-gy, -gx).astype(np.float32)
+        self.grad_strong_mask = (np.abs(gx) > 0.1) | (np.abs(gy) > 0.1)
+        self.sense_map = sensing_map(self.terrain_map == 2, self.terrain_map == 3,
+                                     self.grad_strong_mask, SENSING_RADIUS)
+        # Bot state is one contiguous float32 slab; rows are x, y, angle, speed, age
+        self._soa = np.empty((5, self.num_bots), dtype=np.float32)
+        self.bot_x, self.bot_y, self.bot_angles, self.bot_speeds, self.bot_ages = self._soa
         center_x, center_y = self.width // 2, self.height // 2
-        angles = np.random.uniform(0, 2*np.pi, self.num_bots)
-        radii = np.random.uniform(0, min(self.width, self.height)/4, self.num_bots)
-        self.bot_positions[:, 0] = center_x + radii * np.cos(angles)
-        self.bot_positions[:, 1] = center_y + radii * np.sin(angles)
-        self.bot_angles = np.random.uniform(0, 2*np.pi, self.num_bots)
+        angles = np.random.uniform(0, 2*np.pi, self.num_bots).astype(np.float32)
+        radii = np.random.uniform(0, min(self.width, self.height)/4, self.num_bots).astype(np.float32)
+        np.cos(angles, out=self.bot_x)
+        self.bot_x *= radii
+        self.bot_x += center_x
+        np.sin(angles, out=self.bot_y)
+        self.bot_y *= radii
+        self.bot_y += center_y
+        self.bot_angles[:] = np.random.uniform(0, 2*np.pi, self.num_bots)
         base_speeds = np.random.uniform(*SPEED_RANGE, self.num_bots)
-        self.bot_ages = np.random.uniform(*AGE_RANGE, self.num_bots)
+        self.bot_ages[:] = np.random.uniform(*AGE_RANGE, self.num_bots)
         speed_multipliers = AGE_SPEED_FACTOR * (1.1 - self.bot_ages)
-        self.bot_speeds = base_speeds * speed_multipliers
-        for age in self.bot_ages:
-            if age < 0.4:
-                colors = [[1.0, 0.0, 0.0], [1.0, 0.5, 0.0], [1.0, 1.0, 0.0]]
-            elif age < 0.7:
-                colors = [[0.8, 0.2, 0.2], [0.8, 0.4, 0.1], [0.7, 0.7, 0.2]]
+        self.bot_speeds[:] = base_speeds * speed_multipliers
+        age_band = np.digitize(self.bot_ages, BOT_AGE_BANDS)
+        self.bot_colors = BOT_COLOR_PALETTE[age_band, np.random.randint(0, 3, self.num_bots)]
+        self.rng = np.random.default_rng()
+        self.rand_buf = np.empty((self.num_bots, 3), dtype=np.float32)
+        self.backend = backend
+        if self.backend == 'cuda':
+            if cuda.is_available():
+                self._init_cuda()
             else:
-                colors = [[0.6, 0.3, 0.3], [0.6, 0.4, 0.2], [0.5, 0.5, 0.3]]
-            self.bot_colors.append(random.choice(colors))
+                print("CUDA not available, falling back to CPU backend")
+                self.backend = 'cpu'
+
+    @property
+    def bot_positions(self):
+        return np.column_stack((self.bot_x, self.bot_y))
+
+    def _init_cuda(self):
+        # Static maps and bot state live on the device for the whole run;
+        # only positions are copied back each frame for rendering.
+        self._d_soa = cuda.to_device(self._soa)
+        self._d_sense_map = cuda.to_device(self.sense_map)
+        self._d_target_angle_map = cuda.to_device(self.target_angle_map)
+        self._rng_states = create_xoroshiro128p_states(self.num_bots, seed=random.getrandbits(32))
+
+    def step(self):
+        if self.backend == 'cuda':
+            blocks = (self.num_bots + CUDA_THREADS_PER_BLOCK - 1) // CUDA_THREADS_PER_BLOCK
+            update_bots_gpu[blocks, CUDA_THREADS_PER_BLOCK](
+                self._d_soa[0], self._d_soa[1], self._d_soa[2], self._d_soa[3], self._d_soa[4],
+                self._d_sense_map, self._d_target_angle_map,
+                self.width, self.height, ELEVATION_PREFERENCE, self._rng_states
+            )
+            self._d_soa[:2].copy_to_host(self._soa[:2])
+        else:
+            self.rng.random(out=self.rand_buf, dtype=np.float32)
+            update_bots_vectorized(
+                self.bot_x, self.bot_y, self.bot_angles, self.bot_speeds, self.bot_ages,
+                self.sense_map, self.target_angle_map,
+                self.width, self.height, ELEVATION_PREFERENCE,
+                self.rand_buf
+            )
+
+    def run_simulation(self, frames=None):
+        # Headless run: the same steps the animation would take, with no figure,
+        # canvas or render thread; for batch runs and servers
+        if frames is None:
+            frames = int(ANIMATION_TIME * FPS)
+        for _ in range(frames):
+            self.step()
 
     def _classify_terrain_vectorized(self):
-        terrain_map = np.zeros((self.height, self.width), dtype=np.uint8)
-        chunk_size = 1000
-        background_norm = self.background.astype(np.float32) / 255.0
-        for y_start in range(0, self.height, chunk_size):
-            y_end = min(y_start + chunk_size, self.height)
-            for x_start in range(0, self.width, chunk_size):
-                x_end = min(x_start + chunk_size, self.width)
-                chunk = background_norm[y_start:y_end, x_start:x_end]
-                for terrain_idx in range(4):
-                    terrain_color = TERRAIN_COLORS_ARRAY[terrain_idx]
-                    distances = np.sum((chunk - terrain_color)**2, axis=2)
-                    if terrain_idx == 0:
-                        min_distances = distances
-                        terrain_map[y_start:y_end, x_start:x_end] = 0
-                    else:
-                        mask = distances < min_distances
-                        terrain_map[y_start:y_end, x_start:x_end][mask] = terrain_idx
-                        min_distances = np.minimum(min_distances, distances)
+        terrain_map = np.empty((self.height, self.width), dtype=np.uint8)
+        strip_rows = 512
+        for y_start in range(0, self.height, strip_rows):
+            y_end = min(y_start + strip_rows, self.height)
+            # Integer distances in 0..255 space; the background is never normalized
+            strip = self.background[y_start:y_end].astype(np.int32)
+            diff = strip[:, :, None, :] - TERRAIN_COLORS_RGB[None, None, :, :]
+            terrain_map[y_start:y_end] = np.einsum('ijkl,ijkl->ijk', diff, diff).argmin(-1)
         return terrain_map
 
     def animate_simulation(self):
+        # The simulation runs on its own thread into a back buffer while the
+        # main thread renders the front one; the frame callbacks only swap them
+        self._pos_front = np.array(self._soa[:2])
+        self._pos_back = np.empty_like(self._pos_front)
+        self._ready = threading.Event()
+        self._consumed = threading.Event()
+        self._stop = threading.Event()
+        worker = threading.Thread(target=self._sim_worker, daemon=True)
+        worker.start()
+        try:
+            if scene is not None:
+                self._animate_vispy()
+            else:
+                self._animate_matplotlib()
+        finally:
+            self._stop.set()
+            self._consumed.set()
+            worker.join()
+
+    def _swap_positions(self, timeout):
+        if not self._ready.wait(timeout=timeout):
+            return False
+        self._pos_front, self._pos_back = self._pos_back, self._pos_front
+        self._ready.clear()
+        self._consumed.set()
+        return True
+
+    def _animate_matplotlib(self):
         fig, ax = plt.subplots(figsize=(10, 10))
         ax.imshow(self.background)
-        ax.set_title("Swarm Simulation")
+        ax.set_title(f"Swarm Simulation - {self.num_bots} Bots")
         ax.set_xticks([])
         ax.set_yticks([])
-        scat = ax.scatter(self.bot_positions[:, 0], self.bot_positions[:, 1],
+        scat = ax.scatter(self.bot_x, self.bot_y,
                           c=self.bot_colors, s=MARKER_SIZE, alpha=ALPHA)
+        # Pin the view to the image so moving points never trigger a relimit
+        ax.set_xlim(0, self.width)
+        ax.set_ylim(self.height, 0)
+        ax.set_autoscale_on(False)
+        # The frame counter sits inside the axes so it is redrawn with the blit
+        frame_text = ax.text(0.02, 0.98, "", transform=ax.transAxes, va='top', color='w')
         frame_count = 0
         def update(frame):
             nonlocal frame_count
-            frame_count += 1
-            update_bots_vectorized(
-                self.bot_positions, self.bot_angles, self.bot_speeds, self.bot_ages,
-                self.terrain_map, self.elevation_data, self.elevation_gradients,
-                self.width, self.height, SENSING_RADIUS, ELEVATION_PREFERENCE
-            )
-            scat.set_offsets(self.bot_positions)
-            ax.set_title(f"Swarm Simulation - {self.num_bots} Bots - Frame {frame_count}")
-            return [scat]
+            if self._swap_positions(1.0 / FPS):
+                frame_count += 1
+            # set_offsets column-stacks into its own array, so the transposed view needs no copy
+            scat.set_offsets(self._pos_front.T)
+            frame_text.set_text(f"Frame {frame_count}")
+            return [scat, frame_text]
         ani = FuncAnimation(fig, update, frames=int(ANIMATION_TIME * FPS), 
                             interval=1000/FPS, blit=True)
         plt.show()
 
+    def _animate_vispy(self):
+        canvas = scene.SceneCanvas(keys='interactive', bgcolor='white', size=(1000, 1000),
+                                   title=f"Swarm Simulation - {self.num_bots} Bots", show=True)
+        view = canvas.central_widget.add_view()
+        scene.visuals.Image(self.background, parent=view.scene)
+        # Points live in a GPU vertex buffer; only their positions are re-uploaded per frame
+        markers = scene.visuals.Markers(parent=view.scene)
+        face_color = np.column_stack((self.bot_colors, np.full(self.num_bots, ALPHA, dtype=np.float32)))
+        # scatter's s is an area in points^2, Markers wants a diameter in pixels
+        marker_px = np.sqrt(MARKER_SIZE) * 100 / 72
+        markers.set_data(pos=self._pos_front.T, face_color=face_color, edge_width=0, size=marker_px)
+        view.camera = scene.PanZoomCamera(aspect=1)
+        view.camera.flip = (False, True, False)  # image rows grow downwards
+        view.camera.set_range(x=(0, self.width), y=(0, self.height), margin=0)
+        frame_text = scene.visuals.Text("", color='white', font_size=10, anchor_x='left', anchor_y='top',
+                                        pos=(10, 10), parent=canvas.scene)
+        frame_count = 0
+        def update(event):
+            nonlocal frame_count
+            if self._swap_positions(1.0 / FPS):
+                frame_count += 1
+                markers.set_data(pos=self._pos_front.T, face_color=face_color, edge_width=0, size=marker_px)
+                frame_text.text = f"Frame {frame_count}"
+        timer = vispy_app.Timer(interval=1.0 / FPS, connect=update,
+                                iterations=int(ANIMATION_TIME * FPS), start=True)
+        vispy_app.run()
+
+    def _sim_worker(self):
+        while not self._stop.is_set():
+            self.step()
+            np.copyto(self._pos_back, self._soa[:2])
+            self._ready.set()
+            self._consumed.wait()
+            self._consumed.clear()
+
     def save_bot_states_csv(self, filename):
-        with open(filename, mode='w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['id', 'x', 'y', 'age', 'speed'])
-            for i in range(self.num_bots):
-                x, y = self.bot_positions[i]
-                age = self.bot_ages[i]
-                speed = self.bot_speeds[i]
-                writer.writerow([i, x, y, age, speed])
+        # One formatted write of the state columns instead of a writerow per bot
+        states = np.column_stack([np.arange(self.num_bots), self.bot_x, self.bot_y,
+                                  self.bot_ages, self.bot_speeds])
+        np.savetxt(filename, states, delimiter=',', header='id,x,y,age,speed', comments='',
+                   fmt=['%d', '%.6f', '%.6f', '%.6f', '%.6f'])
 
 if __name__ == "__main__":
+    # --headless runs the same simulations without opening a window
+    headless = '--headless' in sys.argv[1:]
     bot_counts = [25, 200, 600]
     for count in bot_counts:
         try:
-            print(f"\n--- Starting animated simulation with {count} bots for {ANIMATION_TIME} seconds... ---")
-            swarm = OptimizedSwarmBot(num_bots=count, image_path='image.png', lat_center=40.7128, lon_center=-74.0060)
+            mode = "headless" if headless else "animated"
+            print(f"\n--- Starting {mode} simulation with {count} bots for {ANIMATION_TIME} seconds... ---")
+            swarm = OptimizedSwarmBot(num_bots=count, image_path=os.path.join(os.path.dirname(__file__), 'image.png'),
+                                      lat_center=40.7128, lon_center=-74.0060)
             if count == 600:
                 swarm.save_bot_states_csv('bots_600.csv')
             start_time = time.time()
-            swarm.animate_simulation()
+            if headless:
+                swarm.run_simulation()
+            else:
+                swarm.animate_simulation()
             end_time = time.time()
-            print(f"Total animation time for {count} bots: {end_time - start_time:.2f} seconds")
+            print(f"Total {mode} time for {count} bots: {end_time - start_time:.2f} seconds")
         except Exception as e:
             print(f"Error with {count} bots: {e}")
             import traceback
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from scipy.ndimage import gaussian_filter, sobel
+from urllib3.util.retry import Retry
+
+# Elevation and terrain code shared by the simulators: paced, concurrent
+# open-elevation lookups, one on-disk cache of the sampled points, the
+# per-pixel fields derived from them, and the swarm density estimate
+ELEVATION_API_URL = "https://api.open-elevation.com/api/v1/lookup"
+ELEVATION_TILE_DIR = "elevation_tiles"
+ELEVATION_TILE_DECIMALS = 1
+ELEVATION_POINT_DECIMALS = 5
+ELEVATION_MIN_INTERVAL = 1.0  # open-elevation allows about one request per second
+ELEVATION_BATCH_SIZE = 1000
+ELEVATION_WORKERS = 4
+
+# Per-pixel terrain reaction codes stored in sense_map
+SENSE_WATER = 0
+SENSE_ROAD = 1
+SENSE_ELEVATION = 2
+SENSE_FLAT = 3  # elevation-following pixel whose slope is too weak to steer by
+
+# Token bucket shared by the fetch threads; acquire() blocks until a token is free
+class RateLimiter:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def elevation_session():
+    """Keep-alive session with compressed responses, a connection per worker and retries"""
+    session = requests.Session()
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({'POST'}))
+    adapter = HTTPAdapter(pool_connections=ELEVATION_WORKERS, pool_maxsize=ELEVATION_WORKERS, max_retries=retry)
+    session.mount('https://', adapter)
+    return session
+
+def fetch_elevation_batch(session, limiter, batch):
+    """Elevations for a list of (lat, lon) points, or None if the batch failed"""
+    # POST with a JSON body: no URL length cap, so batches can be 10x larger than a GET allows
+    payload = {'locations': [{'latitude': lat, 'longitude': lon} for lat, lon in batch]}
+    limiter.acquire()
+    try:
+        response = session.post(ELEVATION_API_URL, json=payload, timeout=(5, 30))
+        if response.status_code != 200:
+            return None
+        elevations = [result['elevation'] for result in response.json()['results']]
+    except (requests.RequestException, ValueError, KeyError):
+        return None
+    return elevations if len(elevations) == len(batch) else None
+
+def _tile_key(lat, lon):
+    return (round(lat, ELEVATION_TILE_DECIMALS), round(lon, ELEVATION_TILE_DECIMALS))
+
+def _tile_path(cache_dir, tile_lat, tile_lon):
+    return os.path.join(cache_dir, f"tile_{tile_lat:.{ELEVATION_TILE_DECIMALS}f}_{tile_lon:.{ELEVATION_TILE_DECIMALS}f}.npz")
+
+def _load_tile(path):
+    try:
+        with np.load(path) as tile:
+            return dict(zip(zip(tile['lats'].tolist(), tile['lons'].tolist()), tile['elevations'].tolist()))
+    except (OSError, KeyError, ValueError):
+        return {}
+
+def _save_tile(path, points):
+    keys = list(points)
+    np.savez_compressed(
+        path,
+        lats=np.array([k[0] for k in keys]),
+        lons=np.array([k[1] for k in keys]),
+        elevations=np.array([points[k] for k in keys], dtype=np.float32)
+    )
+
+def fetch_elevation_samples(lats, lons, cache_dir=ELEVATION_TILE_DIR):
+    """Elevation at every (lat, lon) of the grid, as a float32 (len(lats), len(lons)) array
+
+    Samples are cached per point in compressed tiles keyed by lat/lon rounded
+    to ELEVATION_POINT_DECIMALS, so a shifted or resized view only downloads
+    the points it has not seen yet; pass cache_dir=None to skip the cache.
+    The API is always queried at the exact coordinates. Points whose batch
+    fails get random values and are not cached, so they are retried next time.
+    """
+    locations = [(float(lat), float(lon)) for lat in lats for lon in lons]
+    point_keys = [(round(lat, ELEVATION_POINT_DECIMALS), round(lon, ELEVATION_POINT_DECIMALS))
+                  for lat, lon in locations]
+    all_elevations = np.empty(len(locations), dtype=np.float32)
+    tiles, dirty_tiles = {}, set()
+    missing = list(range(len(locations)))
+    if cache_dir:
+        missing = []
+        for idx, key in enumerate(point_keys):
+            tile_key = _tile_key(*key)
+            if tile_key not in tiles:
+                tiles[tile_key] = _load_tile(_tile_path(cache_dir, *tile_key))
+            elevation = tiles[tile_key].get(key)
+            if elevation is None:
+                missing.append(idx)
+            else:
+                all_elevations[idx] = elevation
+        print(f"Elevation cache: {len(locations) - len(missing)} hits, {len(missing)} to fetch")
+
+    batches = [missing[i:i+ELEVATION_BATCH_SIZE] for i in range(0, len(missing), ELEVATION_BATCH_SIZE)]
+    if batches:
+        # Batches go out concurrently on one keep-alive session, paced by a shared token bucket
+        limiter = RateLimiter(1.0 / ELEVATION_MIN_INTERVAL)
+        with elevation_session() as session, ThreadPoolExecutor(max_workers=ELEVATION_WORKERS) as pool:
+            futures = {
+                pool.submit(fetch_elevation_batch, session, limiter, [locations[idx] for idx in batch]): batch
+                for batch in batches
+            }
+            fetched = 0
+            for future in as_completed(futures):
+                batch = futures[future]
+                elevations = future.result()
+                if elevations is None:
+                    all_elevations[batch] = np.random.uniform(0, 100, len(batch))
+                    continue
+                all_elevations[batch] = elevations
+                fetched += 1
+                if cache_dir:
+                    for idx, elevation in zip(batch, elevations):
+                        tile_key = _tile_key(*point_keys[idx])
+                        tiles[tile_key][point_keys[idx]] = elevation
+                        dirty_tiles.add(tile_key)
+        print(f"Fetched {fetched}/{len(batches)} elevation batches")
+
+    if dirty_tiles:
+        os.makedirs(cache_dir, exist_ok=True)
+        for tile_key in dirty_tiles:
+            _save_tile(_tile_path(cache_dir, *tile_key), tiles[tile_key])
+        print(f"Cached {len(dirty_tiles)} elevation tiles to {cache_dir}")
+    return all_elevations.reshape(len(lats), len(lons))
+
+def sobel_gradient(elevation):
+    """Smoothed (gy, gx) elevation slope per pixel, on np.gradient's scale
+
+    A separable 3x3 Sobel divided by 8 is the central difference averaged
+    1-2-1 across the neighbouring rows (or columns).
+    """
+    gx = sobel(elevation, axis=1, output=np.float32, mode='nearest')
+    gy = sobel(elevation, axis=0, output=np.float32, mode='nearest')
+    gx /= 8
+    gy /= 8
+    return gy, gx
+
+def _summed_area_table(mask):
+    sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+    np.cumsum(np.cumsum(mask, axis=0, dtype=np.int32), axis=1, out=sat[1:, 1:])
+    return sat
+
+def sensing_map(water_mask, road_mask, grad_strong_mask, radius):
+    """Reaction (a SENSE_* code) a bot would take at every pixel, as a uint8 map
+
+    Water and road pixels are counted in each pixel's (2 * radius + 1)^2
+    window, clipped at the borders, from summed-area tables in O(1) per pixel.
+    """
+    height, width = water_mask.shape
+    water_sat = _summed_area_table(water_mask)
+    road_sat = _summed_area_table(road_mask)
+    ys, xs = np.arange(height), np.arange(width)
+    y_min, y_max = np.maximum(ys - radius, 0), np.minimum(ys + radius + 1, height)
+    x_min, x_max = np.maximum(xs - radius, 0), np.minimum(xs + radius + 1, width)
+
+    def window_counts(sat):
+        return (sat[np.ix_(y_max, x_max)] - sat[np.ix_(y_min, x_max)]
+                - sat[np.ix_(y_max, x_min)] + sat[np.ix_(y_min, x_min)])
+
+    water_count = window_counts(water_sat)
+    road_count = window_counts(road_sat)
+    total_pixels = (y_max - y_min)[:, None] * (x_max - x_min)[None, :]
+    sense_map = np.full((height, width), SENSE_ELEVATION, dtype=np.uint8)
+    sense_map[~grad_strong_mask] = SENSE_FLAT
+    sense_map[road_count > water_count] = SENSE_ROAD
+    sense_map[(water_count > 0) & (water_count < total_pixels * 0.8)] = SENSE_WATER
+    return sense_map
+
+def histogram_kde_grid(values, x_grid, y_grid):
+    """Scott-bandwidth Gaussian KDE on a regular grid, by smoothing a 2D histogram
+
+    Points are binned onto cells centered on the grid points and blurred with
+    a per-axis Gaussian, O(N + G) instead of one kernel evaluation per
+    (point, grid point) pair.
+    """
+    dx, dy = float(x_grid[1] - x_grid[0]), float(y_grid[1] - y_grid[0])
+    x_edges = np.append(x_grid - dx / 2, x_grid[-1] + dx / 2)
+    y_edges = np.append(y_grid - dy / 2, y_grid[-1] + dy / 2)
+    hist, _, _ = np.histogram2d(values[1], values[0], bins=[y_edges, x_edges])
+    n = values.shape[1]
+    bw = values.std(axis=1) * n ** (-1 / 6)
+    # mode='constant' lets mass fall off the map as a KDE does, instead of reflecting it
+    return gaussian_filter(hist / (n * dx * dy), sigma=(bw[1] / dy, bw[0] / dx), mode='constant')
@@ -1,39 +1,89 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.cluster import DBSCAN
-from scipy.ndimage import label, find_objects
+from scipy.ndimage import label, find_objects, gaussian_filter, zoom
 import random
-from scipy.stats import gaussian_kde
 import csv
-
-def generate_density_map_from_data(coords, map_size=(2000, 2000)):
+from collections import deque
+from numba import njit
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import pdist
+try:
+    # Parallel grid-based DBSCAN; much faster than sklearn on 2-D data when installed
+    from dbscan import DBSCAN as FastDBSCAN
+except ImportError:
+    FastDBSCAN = None
+
+# Waypoint count above which plan_flight_path switches to KD-tree queries
+KDTREE_MIN_WAYPOINTS = 10000
+# KDE bandwidth (in grid cells) above which the smoothing uses FFT convolution
+FFT_SIGMA_THRESHOLD = 8
+# Point count above which approximate=None switches sklearn DBSCAN to grid-snapped
+# input; never used when the dbscan package is installed, which is faster exact
+APPROX_DBSCAN_THRESHOLD = 5000
+# Snap cell size used by approximate DBSCAN, as a fraction of eps
+APPROX_DBSCAN_SNAP = 0.25
+# Bounding-grid cell count above which grid clustering hashes the occupied
+# cells instead of labelling a dense occupancy image
+GRID_CLUSTER_MAX_CELLS = 1 << 24
+# POI count above which visualize_flight_plan skips the pairwise distance labels
+MAX_ANNOTATED_POIS = 20
+
+def _gaussian_kernel_1d(sigma, truncate=3.0):
+    radius = int(truncate * sigma + 0.5)
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+    return kernel / kernel.sum()
+
+def generate_density_map_from_data(coords, map_size=(2000, 2000), grid_size=256, grid=None):
     """
     Generates a probability density map from a set of discrete coordinates
-    using Kernel Density Estimation (KDE).
+    using a histogram-binned Gaussian Kernel Density Estimation (KDE).
 
     Args:
         coords (np.ndarray): An array of coordinates, shape (n, 2), where n is the number of points.
         map_size (tuple): The (width, height) of the output map.
+        grid_size (int): Maximum resolution of the grid the KDE is evaluated on
+                         before it is bilinearly upsampled to the output size.
+        grid (tuple, optional): The (width, height) of the returned array when it
+                                should differ from map_size, which then only sets
+                                the coordinate extent. Defaults to map_size.
 
     Returns:
-        np.ndarray: A 2D array representing the probability density map.
+        np.ndarray: A 2D float32 array representing the probability density map.
     """
     x, y = coords[:, 0], coords[:, 1]
-    
-    # Create a grid for the density map
-    xmin, xmax = 0, map_size[0]
-    ymin, ymax = 0, map_size[1]
-    X, Y = np.meshgrid(np.linspace(xmin, xmax, map_size[0]),
-                       np.linspace(ymin, ymax, map_size[1]))
-    
-    # Use Gaussian KDE to estimate the density
-    positions = np.vstack([X.ravel(), Y.ravel()])
-    values = np.vstack([x, y])
-    kernel = gaussian_kde(values)
-    Z = np.reshape(kernel(positions).T, X.shape)
-    
-    # Normalize the density map to a 0-1 range
-    Z = (Z - Z.min()) / (Z.max() - Z.min())
+    width, height = map_size
+    out_w, out_h = grid if grid is not None else map_size
+    # The KDE is band-limited by its bandwidth, so a coarse grid loses nothing visible
+    grid_w, grid_h = min(out_w, grid_size), min(out_h, grid_size)
+
+    # Bin the points straight into (rows=y, cols=x) order with one bincount;
+    # points exactly on the far edge go in the last cell, as with histogram2d
+    inside = (x >= 0) & (x <= width) & (y >= 0) & (y <= height)
+    col = np.minimum((x[inside] * (grid_w / width)).astype(np.intp), grid_w - 1)
+    row = np.minimum((y[inside] * (grid_h / height)).astype(np.intp), grid_h - 1)
+    counts = np.bincount(row * grid_w + col, minlength=grid_h * grid_w).reshape(grid_h, grid_w)
+
+    # Smoothing the histogram with a Gaussian gives the same surface as a
+    # Gaussian KDE, using Scott's rule for the per-axis bandwidth in grid cells
+    scott_factor = len(coords) ** (-1.0 / 6.0)
+    sigma = (max(np.std(y) * scott_factor * grid_h / height, 0.5),
+             max(np.std(x) * scott_factor * grid_w / width, 0.5))
+    # mode='constant' treats everything off-map as empty, as a KDE does,
+    # instead of reflecting edge density back onto the map
+    if max(sigma) > FFT_SIGMA_THRESHOLD:
+        # Wide kernels are cheaper as one FFT convolution than as separable passes
+        from scipy.signal import fftconvolve  # deferred: scipy.signal is slow to import
+        kernel = np.outer(_gaussian_kernel_1d(sigma[0]), _gaussian_kernel_1d(sigma[1]))
+        Z = fftconvolve(counts.astype(np.float32), kernel, mode='same').astype(np.float32)
+    else:
+        Z = gaussian_filter(counts, sigma=sigma, output=np.float32, mode='constant', truncate=3.0)
+    if (grid_h, grid_w) != (out_h, out_w):
+        Z = zoom(Z, (out_h / grid_h, out_w / grid_w), order=1)
+
+    # Normalize the density map to a 0-1 range in place: after shifting by the
+    # minimum, the maximum of the shifted map is the range
+    Z -= Z.min()
+    Z /= Z.max() + 1e-12
     return Z
 
 def load_coords_from_csv(filepath):
@@ -47,6 +97,16 @@ def load_coords_from_csv(filepath):
     Returns:
         np.ndarray: A NumPy array of (x, y) coordinates.
     """
+    # Fast path: parse the two numeric columns in C with np.loadtxt
+    try:
+        with open(filepath, mode='r') as file:
+            header = next(csv.reader(file))
+            columns = (header.index('x'), header.index('y'))
+            return np.loadtxt(file, delimiter=',', usecols=columns, ndmin=2)
+    except (StopIteration, ValueError):
+        pass
+
+    # Slow path for files with malformed rows: skip them one by one
     coords = []
     with open(filepath, mode='r') as file:
         reader = csv.DictReader(file)
@@ -55,12 +115,115 @@ def load_coords_from_csv(filepath):
                 x = float(row['x'])
                 y = float(row['y'])
                 coords.append([x, y])
-            except (ValueError, KeyError) as e:
+            except (ValueError, KeyError, TypeError) as e:
                 print(f"Skipping row due to data error: {row}. Error: {e}")
                 continue
     return np.array(coords)
 
-def find_hotspots_with_dbscan(coords, eps=50, min_samples=5):
+def _hashed_cell_components(cells):
+    # 8-connected components of the occupied cells by BFS over a hash of the
+    # (row, col) keys; memory is O(N) however far apart the points are.
+    # Components are numbered in raster order, as ndimage.label numbers them
+    unique_cells, inverse = np.unique(cells[:, ::-1], axis=0, return_inverse=True)
+    keys = list(map(tuple, unique_cells.tolist()))
+    index = {key: i for i, key in enumerate(keys)}
+    component = [-1] * len(keys)
+    count = 0
+    for start in range(len(keys)):
+        if component[start] >= 0:
+            continue
+        component[start] = count
+        queue = deque([start])
+        while queue:
+            row, col = keys[queue.popleft()]
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    j = index.get((row + dr, col + dc))
+                    if j is not None and component[j] < 0:
+                        component[j] = count
+                        queue.append(j)
+        count += 1
+    return np.asarray(component, dtype=np.int64)[inverse.ravel()]
+
+def _grid_cluster_labels(coords, eps, min_samples):
+    # Snap points to eps-sized cells and take 8-connected components of the
+    # occupied cells as clusters; components with fewer than min_samples
+    # points are noise
+    cells = np.floor(np.asarray(coords, dtype=np.float64) / eps).astype(np.int64)
+    cells -= cells.min(axis=0)
+    cols, rows = cells[:, 0], cells[:, 1]
+    extent = (int(rows.max()) + 1) * (int(cols.max()) + 1)
+    if extent <= GRID_CLUSTER_MAX_CELLS:
+        # Compact extent: label a dense occupancy image in one C pass
+        occupied = np.zeros((rows.max() + 1, cols.max() + 1), dtype=bool)
+        occupied[rows, cols] = True
+        components, _ = label(occupied, structure=np.ones((3, 3), dtype=bool))
+        labels = components[rows, cols] - 1
+    else:
+        # Sparse or outlier-stretched extent: a dense image would not fit
+        labels = _hashed_cell_components(cells)
+    sizes = np.bincount(labels)
+    labels[sizes[labels] < min_samples] = -1
+    return labels
+
+def find_hotspots_csr(coords, eps=50, min_samples=5, snap=None, algorithm='dbscan'):
+    """
+    Clusters data points with DBSCAN and returns the clusters in a compact
+    CSR-style layout: all clustered points in one array, sorted by cluster.
+
+    Args:
+        coords (np.ndarray): The coordinates of the data points.
+        eps (float): The maximum distance between two samples for them to be considered
+                     as in the same neighborhood.
+        min_samples (int): The number of samples in a neighborhood for a point to be
+                           considered as a core point.
+        snap (float, optional): If given, cluster on coordinates rounded to a grid of this
+                                cell size (e.g. eps / 4) so near-duplicates collapse into
+                                one weighted sample. Returned points are never snapped.
+        algorithm (str): 'dbscan', or 'grid' to link points through 8-connected
+                         eps-sized grid cells instead of exact eps neighborhoods.
+                         Much faster on pixel-grid data such as MCS heatmaps.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]:
+            - points (np.ndarray): (M, 2) contiguous float64 coordinates of all
+              non-noise points, grouped by cluster.
+            - offsets (np.ndarray): (K+1,) int32 array; cluster k is
+              points[offsets[k]:offsets[k+1]].
+    """
+    # Use DBSCAN to find clusters
+    print(eps)
+    if len(coords) == 0:
+        return np.empty((0, 2), dtype=np.float64), np.zeros(1, dtype=np.int32)
+    if algorithm == 'grid':
+        labels = _grid_cluster_labels(coords, eps, min_samples)
+    elif FastDBSCAN is not None and snap is None:
+        labels, _ = FastDBSCAN(np.ascontiguousarray(coords, dtype=np.float64), eps=eps, min_samples=min_samples)
+    else:
+        # Collapse repeated (or snapped) coordinates into one sample weighted by
+        # its multiplicity, then map the labels back onto every original point
+        keys = np.asarray(coords, dtype=np.float64)
+        if snap is not None:
+            keys = np.round(keys / snap) * snap
+        unique_coords, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        from sklearn.cluster import DBSCAN  # deferred: importing sklearn costs ~1 s
+        db = DBSCAN(eps=eps, min_samples=min_samples, algorithm='kd_tree',
+                    leaf_size=32, n_jobs=-1).fit(unique_coords, sample_weight=counts)
+        labels = db.labels_[inverse.reshape(-1)]
+
+    # Drop noise (label -1), then group the points by label in one sorted pass
+    mask = labels >= 0
+    cluster_labels = labels[mask]
+    if len(cluster_labels) == 0:
+        return np.empty((0, 2), dtype=np.float64), np.zeros(1, dtype=np.int32)
+    order = np.argsort(cluster_labels, kind='stable')
+    points = np.ascontiguousarray(np.asarray(coords, dtype=np.float64)[mask][order])
+    boundaries = np.flatnonzero(np.diff(cluster_labels[order])) + 1
+    offsets = np.concatenate(([0], boundaries, [len(points)])).astype(np.int32)
+    return points, offsets
+
+def find_hotspots_with_dbscan(coords, eps=50, min_samples=5, return_centroids=False, snap=None,
+                             approximate=False, algorithm='dbscan'):
     """
     Identifies 'hot spots' by clustering data points using DBSCAN.
 
@@ -70,29 +233,44 @@ def find_hotspots_with_dbscan(coords, eps=50, min_samples=5):
                      as in the same neighborhood. This is analogous to the "hot spot" radius.
         min_samples (int): The number of samples in a neighborhood for a point to be
                            considered as a core point.
+        return_centroids (bool): Also return the centroid of each cluster.
+        snap (float, optional): Grid cell size used to merge near-duplicate points
+                                before clustering; see find_hotspots_csr.
+        approximate (bool, optional): Cluster on coordinates snapped to an
+                                      eps * APPROX_DBSCAN_SNAP grid, trading exact
+                                      neighborhoods for far fewer samples. Snapped
+                                      input always goes through sklearn. None enables
+                                      it only when the dbscan package is missing and
+                                      the input has APPROX_DBSCAN_THRESHOLD points or more.
+        algorithm (str): 'dbscan' or 'grid'; see find_hotspots_csr.
 
     Returns:
         list: A list of NumPy arrays, where each array contains the coordinates of a
-              detected hot spot cluster.
+              detected hot spot cluster. If return_centroids is True, a tuple of that
+              list and an (n_clusters, 2) array of centroids.
     """
-    # Use DBSCAN to find clusters
-    print(eps)
-    db = DBSCAN(eps=eps, min_samples=min_samples).fit(coords)
-    labels = db.labels_
-    
-    # Get unique cluster labels, excluding noise (label -1)
-    unique_labels = set(labels)
-    hotspots = []
-    
-    for k in unique_labels:
-        if k == -1:
-            # Noise points are not considered hot spots
-            continue
-        class_member_mask = (labels == k)
-        cluster_coords = coords[class_member_mask]
-        hotspots.append(cluster_coords)
-        
-    return hotspots
+    if approximate is None:
+        approximate = FastDBSCAN is None and len(coords) >= APPROX_DBSCAN_THRESHOLD
+    if approximate and snap is None:
+        snap = eps * APPROX_DBSCAN_SNAP
+    points, offsets = find_hotspots_csr(coords, eps=eps, min_samples=min_samples, snap=snap,
+                                        algorithm=algorithm)
+    if len(points) == 0:
+        return ([], np.empty((0, 2))) if return_centroids else []
+    hotspots = np.split(points, offsets[1:-1])
+    if not return_centroids:
+        return hotspots
+
+    sums = np.add.reduceat(points, offsets[:-1], axis=0)
+    return hotspots, sums / np.diff(offsets)[:, None]
+
+def _random_map_positions(count, map_size):
+    return np.random.uniform((100, 100), (map_size[0]-100, map_size[1]-100), size=(count, 2))
+
+def _min_distance_to_selected(positions, selected_pois):
+    # Distance from each position to its nearest already-selected POI
+    selected_array = np.asarray(selected_pois)
+    return np.linalg.norm(positions[:, None, :] - selected_array[None, :, :], axis=2).min(axis=1)
 
 def select_distributed_pois(hotspot_centroids, target_count=6, min_distance=200, map_size=(2000, 2000)):
     """
@@ -146,36 +324,28 @@ def select_distributed_pois(hotspot_centroids, target_count=6, min_distance=200,
         return np.array(selected_pois)
     
     # If we have more hotspots than target, select the best distributed ones
-    selected_pois = []
-    candidates = list(hotspot_centroids)
+    candidates = np.asarray(hotspot_centroids, dtype=np.float64)
     
     # Start with the hotspot closest to center
     center = np.array([map_size[0]/2, map_size[1]/2])
-    distances_to_center = [np.linalg.norm(centroid - center) for centroid in candidates]
-    first_idx = np.argmin(distances_to_center)
-    selected_pois.append(candidates[first_idx])
-    candidates = np.delete(candidates, first_idx, axis=0)
+    first_idx = np.argmin(np.linalg.norm(candidates - center, axis=1))
+    selected_pois = [candidates[first_idx]]
+    alive = np.ones(len(candidates), dtype=bool)
+    alive[first_idx] = False
+    
+    # Distance from each candidate to its nearest selected POI, updated
+    # incrementally as POIs are added; selected candidates drop out via alive
+    min_dist = np.linalg.norm(candidates - selected_pois[0], axis=1)
+    min_dist[~alive] = -np.inf
     
     # Select remaining POIs using maximum distance criterion
-    while len(selected_pois) < target_count and len(candidates) > 0:
-        max_min_distance = -1
-        best_candidate_idx = -1
-        
-        for i, candidate in enumerate(candidates):
-            # Find minimum distance to any already selected POI
-            min_distance_to_selected = min([np.linalg.norm(candidate - poi) 
-                                          for poi in selected_pois])
-            
-            # Select the candidate with the maximum minimum distance
-            if min_distance_to_selected > max_min_distance:
-                max_min_distance = min_distance_to_selected
-                best_candidate_idx = i
-        
-        if best_candidate_idx >= 0:
-            selected_pois.append(candidates[best_candidate_idx])
-            candidates = np.delete(candidates, best_candidate_idx, axis=0)
-        else:
-            break
+    while len(selected_pois) < target_count and alive.any():
+        best_candidate_idx = int(np.argmax(min_dist))
+        new_poi = candidates[best_candidate_idx]
+        selected_pois.append(new_poi)
+        alive[best_candidate_idx] = False
+        np.minimum(min_dist, np.linalg.norm(candidates - new_poi, axis=1), out=min_dist)
+        min_dist[best_candidate_idx] = -np.inf
     
     # If we still need more POIs, add them strategically
     safety_counter = 0  # Add safety counter to prevent infinite loops
@@ -184,57 +354,88 @@ def select_distributed_pois(hotspot_centroids, target_count=6, min_distance=200,
     while len(selected_pois) < target_count and safety_counter < max_iterations:
         safety_counter += 1
         
-        # Find the largest gap between existing POIs and place a new one there
-        best_position = None
-        max_min_distance = 0
-        
-        # Try multiple random positions and pick the one farthest from existing POIs
-        for _ in range(50):  # Try 50 random positions
-            candidate = np.array([
-                random.uniform(100, map_size[0]-100),
-                random.uniform(100, map_size[1]-100)
-            ])
-            
-            min_distance_to_existing = min([np.linalg.norm(candidate - poi) 
-                                          for poi in selected_pois])
-            
-            if min_distance_to_existing > max_min_distance:
-                max_min_distance = min_distance_to_existing
-                best_position = candidate
+        # Try 50 random positions at once and pick the one farthest from existing POIs
+        random_positions = _random_map_positions(50, map_size)
+        distances_to_existing = _min_distance_to_selected(random_positions, selected_pois)
+        best_idx = int(np.argmax(distances_to_existing))
+        best_position = random_positions[best_idx]
+        max_min_distance = distances_to_existing[best_idx]
         
         # Dynamically reduce min_distance requirement if having trouble placing POIs
         dynamic_min_distance = min_distance * (1.0 - safety_counter / max_iterations)
         
-        if best_position is not None and max_min_distance >= dynamic_min_distance:
+        if max_min_distance >= dynamic_min_distance:
             selected_pois.append(best_position)
         else:
-            # If we can't find a good position, place it randomly but ensure minimum distance
-            attempts = 0
-            while attempts < 50 and len(selected_pois) < target_count:  # Reduce attempts
-                candidate = np.array([
-                    random.uniform(100, map_size[0]-100),
-                    random.uniform(100, map_size[1]-100)
-                ])
-                
-                min_distance_to_existing = min([np.linalg.norm(candidate - poi) 
-                                              for poi in selected_pois])
-                
-                if min_distance_to_existing >= dynamic_min_distance * 0.5:  # Further relax constraint
-                    selected_pois.append(candidate)
-                    break
-                attempts += 1
-            
-            if attempts >= 50:
+            # If we can't find a good position, take the first of 50 random
+            # positions that meets a further relaxed minimum distance
+            random_positions = _random_map_positions(50, map_size)
+            distances_to_existing = _min_distance_to_selected(random_positions, selected_pois)
+            acceptable = np.flatnonzero(distances_to_existing >= dynamic_min_distance * 0.5)
+            if len(acceptable) > 0:
+                selected_pois.append(random_positions[acceptable[0]])
+            else:
                 # If still can't place with constraints, just add it anyway to avoid infinite loop
-                candidate = np.array([
-                    random.uniform(100, map_size[0]-100),
-                    random.uniform(100, map_size[1]-100)
-                ])
-                selected_pois.append(candidate)
+                selected_pois.append(_random_map_positions(1, map_size)[0])
     
     print(f"Selected {len(selected_pois)} POIs after {safety_counter} iterations")
     return np.array(selected_pois)
 
+@njit('f8[:, ::1](f8[:, ::1], f8, f8)', cache=True)
+def _plan_flight_path_nb(waypoints, start_x, start_y):
+    n = waypoints.shape[0]
+    visited = np.zeros(n, dtype=np.bool_)
+    flight_path = np.empty((n + 1, 2), dtype=np.float64)
+    flight_path[0, 0] = start_x
+    flight_path[0, 1] = start_y
+    current_x, current_y = start_x, start_y
+
+    for step in range(1, n + 1):
+        # Squared distance is enough to find the nearest unvisited waypoint
+        best_index = -1
+        best_distance = np.inf
+        for i in range(n):
+            if not visited[i]:
+                dx = waypoints[i, 0] - current_x
+                dy = waypoints[i, 1] - current_y
+                distance = dx * dx + dy * dy
+                if distance < best_distance:
+                    best_distance = distance
+                    best_index = i
+
+        visited[best_index] = True
+        current_x = waypoints[best_index, 0]
+        current_y = waypoints[best_index, 1]
+        flight_path[step, 0] = current_x
+        flight_path[step, 1] = current_y
+
+    return flight_path
+
+def _plan_flight_path_kdtree(waypoints, start_x, start_y):
+    n = len(waypoints)
+    tree = cKDTree(waypoints)
+    visited = np.zeros(n, dtype=bool)
+    flight_path = np.empty((n + 1, 2), dtype=np.float64)
+    flight_path[0] = (start_x, start_y)
+
+    for step in range(1, n + 1):
+        # Visited waypoints stay in the tree and are skipped in the results;
+        # widen the query until an unvisited one turns up
+        k = min(32, n)
+        while True:
+            _, neighbors = tree.query(flight_path[step - 1], k=k)
+            neighbors = np.atleast_1d(neighbors)
+            unvisited = neighbors[~visited[neighbors]]
+            if len(unvisited) > 0 or k == n:
+                break
+            k = min(2 * k, n)
+
+        nearest_index = unvisited[0]
+        visited[nearest_index] = True
+        flight_path[step] = waypoints[nearest_index]
+
+    return flight_path
+
 def plan_flight_path(waypoints, start_point=(0, 0)):
     """
     Generates a flight path that visits all waypoints using a greedy nearest-neighbor algorithm.
@@ -249,30 +450,12 @@ def plan_flight_path(waypoints, start_point=(0, 0)):
     if len(waypoints) == 0:
         return np.array([start_point])
 
-    flight_path = [start_point]
-    unvisited = list(range(len(waypoints)))
-    current_point = start_point
-
-    while unvisited:
-        distances = []
-        for i in unvisited:
-            # Calculate Euclidean distance from the current point to each unvisited waypoint
-            dist = np.sqrt((current_point[0] - waypoints[i][0])**2 + (current_point[1] - waypoints[i][1])**2)
-            distances.append((dist, i))
-        
-        # Find the nearest unvisited waypoint
-        distances.sort()
-        nearest_index = distances[0][1]
-        
-        # Move to the nearest waypoint and add it to the path
-        next_waypoint = waypoints[nearest_index]
-        flight_path.append(next_waypoint)
-        
-        # Update current point and remove from unvisited list
-        current_point = next_waypoint
-        unvisited.remove(nearest_index)
-        
-    return np.array(flight_path)
+    # Coordinates may be lat/lng, so stay in float64 to keep the precision
+    waypoints = np.ascontiguousarray(waypoints, dtype=np.float64)
+    # A linear scan per step wins for small inputs; past that a KD-tree query does
+    if len(waypoints) >= KDTREE_MIN_WAYPOINTS:
+        return _plan_flight_path_kdtree(waypoints, float(start_point[0]), float(start_point[1]))
+    return _plan_flight_path_nb(waypoints, float(start_point[0]), float(start_point[1]))
 
 def select_top_dense_grid_pois(coords, grid_rows=5, grid_cols=5, top_k=10):
     """
@@ -323,27 +506,21 @@ def select_top_dense_grid_pois(coords, grid_rows=5, grid_cols=5, top_k=10):
     if k == 0:
         return np.empty((0, 2)), [], xedges, yedges
 
-    # argsort descending
-    top_indices = np.argsort(flat)[::-1][:k]
+    # Select the top k with a linear-time partition, then sort only those descending
+    candidate_indices = np.argpartition(flat, flat.size - k)[flat.size - k:]
+    top_indices = candidate_indices[np.argsort(flat[candidate_indices], kind='stable')[::-1]]
 
-    centers = []
-    cells_info = []
-    n_x_bins = len(xedges) - 1
+    # Map flat indices to (ix, iy) and cell centers in one vectorized pass
     n_y_bins = len(yedges) - 1
-    for idx in top_indices:
-        # Map flat index to (ix, iy)
-        ix = idx // n_y_bins
-        iy = idx % n_y_bins
-        cx = 0.5 * (xedges[ix] + xedges[ix + 1])
-        cy = 0.5 * (yedges[iy] + yedges[iy + 1])
-        centers.append([cx, cy])
-        cells_info.append({
-            'ix': int(ix),
-            'iy': int(iy),
-            'count': int(H[ix, iy])
-        })
-
-    centers = np.array(centers)
+    ix, iy = np.divmod(top_indices, n_y_bins)
+    cx = 0.5 * (xedges[ix] + xedges[ix + 1])
+    cy = 0.5 * (yedges[iy] + yedges[iy + 1])
+    centers = np.column_stack([cx, cy])
+    cells_info = [
+        {'ix': cell_x, 'iy': cell_y, 'count': count}
+        for cell_x, cell_y, count in zip(ix.tolist(), iy.tolist(), H[ix, iy].astype(int).tolist())
+    ]
+
     return centers, cells_info, xedges, yedges
 
 def plan_flight_path_in_order(waypoints_ordered, start_point=(0, 0)):
@@ -376,6 +553,7 @@ def visualize_flight_plan(prob_map, hotspot_clusters, flight_path, all_coords, s
         all_coords (np.ndarray): All original data points.
         selected_pois (np.ndarray): The selected points of interest.
     """
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 10))
     plt.imshow(prob_map, cmap='hot', origin='upper')
     plt.colorbar(label='Probability Density')
@@ -384,14 +562,20 @@ def visualize_flight_plan(prob_map, hotspot_clusters, flight_path, all_coords, s
     plt.ylabel("Y Coordinate")
 
     # Plot the original data points
-    plt.scatter(all_coords[:, 0], all_coords[:, 1], color='lightgray', s=5, alpha=0.3, label='All Data Points')
-
-    # Plot the detected hot spot clusters
-    colors = plt.cm.Set3(np.linspace(0, 1, len(hotspot_clusters)))
-    for i, cluster in enumerate(hotspot_clusters):
-        centroid = np.mean(cluster, axis=0)
-        plt.scatter(cluster[:, 0], cluster[:, 1], color=colors[i], s=15, alpha=0.6, label=f'Hotspot {i+1}')
-        plt.scatter(centroid[0], centroid[1], color='darkblue', marker='x', s=100, linewidths=2)
+    # Rasterized so thousands of points draw as one image rather than one path each
+    plt.scatter(all_coords[:, 0], all_coords[:, 1], color='lightgray', s=5, alpha=0.3, label='All Data Points',
+                rasterized=True)
+
+    # Plot the detected hot spot clusters as one scatter, colored per cluster
+    if len(hotspot_clusters) > 0:
+        cluster_sizes = [len(cluster) for cluster in hotspot_clusters]
+        cluster_points = np.concatenate(hotspot_clusters, axis=0)
+        colors = plt.cm.Set3(np.linspace(0, 1, len(hotspot_clusters)))
+        plt.scatter(cluster_points[:, 0], cluster_points[:, 1], color=np.repeat(colors, cluster_sizes, axis=0),
+                    s=15, alpha=0.6, label=f'Hotspots ({len(hotspot_clusters)})')
+        starts = np.concatenate(([0], np.cumsum(cluster_sizes)[:-1]))
+        centroids = np.add.reduceat(cluster_points, starts, axis=0) / np.array(cluster_sizes)[:, None]
+        plt.scatter(centroids[:, 0], centroids[:, 1], color='darkblue', marker='x', s=100, linewidths=2)
 
     # Plot the selected POIs
     plt.scatter(selected_pois[:, 0], selected_pois[:, 1], color='red', marker='o', s=150, 
@@ -407,13 +591,19 @@ def visualize_flight_plan(prob_map, hotspot_clusters, flight_path, all_coords, s
         plt.scatter(flight_path_array[0, 0], flight_path_array[0, 1], color='green', 
                    marker='s', s=200, label='Start Point', zorder=10, edgecolors='white', linewidths=2)
     
-    # Add distance annotations between POIs
-    for i in range(len(selected_pois)):
-        for j in range(i+1, len(selected_pois)):
-            distance = np.linalg.norm(selected_pois[i] - selected_pois[j])
-            mid_point = (selected_pois[i] + selected_pois[j]) / 2
-            plt.text(mid_point[0], mid_point[1], f'{distance:.0f}', fontsize=8, 
-                    bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.7))
+    # Pairwise POI distances, computed once for the annotations and the summary;
+    # pdist's condensed order matches the (i < j) pairs from triu_indices
+    pair_i, pair_j = np.triu_indices(len(selected_pois), k=1)
+    distances = pdist(selected_pois)
+
+    # Add distance annotations between POIs; the label count grows as k^2, so
+    # they are skipped once there are too many to read anyway
+    if len(selected_pois) <= MAX_ANNOTATED_POIS:
+        ax = plt.gca()
+        label_bbox = dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.7)
+        mid_points = (selected_pois[pair_i] + selected_pois[pair_j]) / 2
+        for mid_point, distance in zip(mid_points.tolist(), distances.tolist()):
+            ax.text(mid_point[0], mid_point[1], f'{distance:.0f}', fontsize=8, bbox=label_bbox)
         
     plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.grid(True, which='both', linestyle=':', linewidth=0.5, alpha=0.3)
@@ -426,12 +616,6 @@ def visualize_flight_plan(prob_map, hotspot_clusters, flight_path, all_coords, s
     print(f"Total flight path points: {len(flight_path_array)}")
     
     if len(selected_pois) > 1:
-        distances = []
-        for i in range(len(selected_pois)):
-            for j in range(i+1, len(selected_pois)):
-                distance = np.linalg.norm(selected_pois[i] - selected_pois[j])
-                distances.append(distance)
-        
         print(f"Min distance between POIs: {min(distances):.1f}")
         print(f"Max distance between POIs: {max(distances):.1f}")
         print(f"Average distance between POIs: {np.mean(distances):.1f}")
@@ -446,16 +630,12 @@ if __name__ == "__main__":
         print(f"Error: The file '{csv_file_path}' was not found. Please make sure it's in the same directory.")
         exit()
     
-    # 1. Use DBSCAN to find hot spot clusters directly from the data
-    hotspot_clusters = find_hotspots_with_dbscan(user_data, eps=5, min_samples=5)
-    
-    # 2. Get hotspot centroids and select distributed POIs
-    if hotspot_clusters:
-        hotspot_centroids = np.array([np.mean(cluster, axis=0) for cluster in hotspot_clusters])
-    else:
-        hotspot_centroids = np.array([])
+    # 1. Use DBSCAN to find hot spot clusters directly from the data, with their centroids
+    hotspot_clusters, hotspot_centroids = find_hotspots_with_dbscan(
+        user_data, eps=5, min_samples=5, return_centroids=True
+    )
     
-    # Select 6-7 well-distributed POIs (randomly choose between 6 and 7)
+    # 2. Select 6-7 well-distributed POIs (randomly choose between 6 and 7)
     target_poi_count = random.choice([6, 7])
     selected_pois = select_distributed_pois(hotspot_centroids, target_count=target_poi_count, min_distance=250)
     
@@ -1,24 +1,62 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Literal, Annotated, TYPE_CHECKING
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+import os
+import threading
 import numpy as np
-import requests
-from flightplan import (
+from .flightplan import (
     generate_density_map_from_data, 
     find_hotspots_with_dbscan, 
     plan_flight_path, 
     load_coords_from_csv
 )
 import base64
+import binascii
 import io
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from PIL import Image, ImageDraw
+try:
+    from msgspec.json import encode as _encode_json
+except ImportError:  # pydantic-core's Rust encoder ships with pydantic v2
+    from pydantic_core import to_json as _encode_json
+
+# matplotlib and requests are imported inside the functions that need them, so
+# workers that never render detailed images or call the MCS API skip loading them
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 app = FastAPI(title="Flight Plan API")
 
+# Number of clustering/density results and rendered images kept in memory
+PLAN_CACHE_SIZE = 64
+IMAGE_CACHE_SIZE = 128
+# Pooled keep-alive connections to the MCS API
+MCS_POOL_SIZE = 8
+# zlib level for the fast PNG path; level 1 is much quicker than the default 6
+PNG_COMPRESS_LEVEL = 1
+# Lossy quality used for the webp and jpeg image formats
+LOSSY_IMAGE_QUALITY = 85
+# Above this many points the detailed visualization bakes them into the image instead of a scatter
+DETAILED_SCATTER_MAX_POINTS = 5000
+IMAGE_MEDIA_TYPES = {'png': 'image/png', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+ImageFormat = Literal['png', 'webp', 'jpeg']
+# ?format= query parameter selecting the encoding of rendered images
+FormatQuery = Annotated[ImageFormat, Query(alias='format')]
+# matplotlib's 'hot' colormap sampled into a 256-entry RGB lookup table,
+# interpolated from its segment data so the fast path needs no matplotlib
+_HOT_X = np.linspace(0, 1, 256)
+_HOT_LUT = (np.stack([
+    np.interp(_HOT_X, [0, 0.365079, 1], [0.0416, 1, 1]),
+    np.interp(_HOT_X, [0, 0.365079, 0.746032, 1], [0, 0, 1, 1]),
+    np.interp(_HOT_X, [0, 0.746032, 1], [0, 0, 1])
+], axis=1) * 255).astype(np.uint8)
+
 # Enable CORS for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -32,12 +70,20 @@ class Coordinate(BaseModel):
     x: float
     y: float
 
-class FlightPlanRequest(BaseModel):
-    coordinates: List[Coordinate]
+class FlightPlanParams(BaseModel):
     eps: Optional[float] = 50.0
     min_samples: Optional[int] = 5
     map_size: Optional[Tuple[int, int]] = (2000, 2000)
+    density_grid: Optional[Tuple[int, int]] = (512, 512)  # None = full map_size resolution
     start_point: Optional[Tuple[float, float]] = None
+    approximate: Optional[bool] = False  # None = approximate only for large inputs without the dbscan package
+    algorithm: Literal['dbscan', 'grid'] = 'dbscan'  # 'grid' = connected eps-sized cells
+
+class FlightPlanRequest(FlightPlanParams):
+    coordinates: List[Coordinate]
+
+class FlightPlanRequestFast(FlightPlanParams):
+    coords_b64: str  # base64 of a little-endian float32 (N, 2) array
 
 class HotspotCluster(BaseModel):
     centroid: Coordinate
@@ -50,6 +96,120 @@ class FlightPlanResponse(BaseModel):
     num_hotspots: int
     probability_map_base64: Optional[str] = None
     visualization_base64: Optional[str] = None
+    probability_map_url: Optional[str] = None
+    visualization_url: Optional[str] = None
+
+class FlightPlanResponseFast(BaseModel):
+    flight_path_b64: str  # base64 float32 (M, 2)
+    centroids_b64: str  # base64 float32 (K, 2)
+    cluster_sizes: List[int]
+    num_hotspots: int
+    probability_map_base64: Optional[str] = None
+    visualization_base64: Optional[str] = None
+    probability_map_url: Optional[str] = None
+    visualization_url: Optional[str] = None
+
+@dataclass
+class CachedPlan:
+    clusters: list
+    centroids: np.ndarray
+    prob_map: np.ndarray
+    prob_map_id: Optional[str]
+    prob_map_image: Optional[bytes]
+    hotspots: Optional[list] = None  # built on first use by _plan_hotspots
+
+class _LRUCache:
+    """Small thread-safe LRU mapping shared by the request handlers."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+@lru_cache(maxsize=1)
+def _mcs_session():
+    """Pooled keep-alive session for MCS API calls, created on first use."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_maxsize=MCS_POOL_SIZE))
+    session.mount('https://', HTTPAdapter(pool_maxsize=MCS_POOL_SIZE))
+    return session
+
+_plan_cache = _LRUCache(PLAN_CACHE_SIZE)
+_image_cache = _LRUCache(IMAGE_CACHE_SIZE)
+
+def _compute_plan(coords: np.ndarray, eps: float, min_samples: int, map_size: Tuple[int, int],
+                  density_grid: Optional[Tuple[int, int]], approximate: Optional[bool], algorithm: str,
+                  detailed: bool, image_format: str, plan_id: str) -> CachedPlan:
+    """Run the clustering and density work that only depends on the input coordinates."""
+    # Find hotspots using DBSCAN; centroids come from one reduction over the clustered points
+    hotspot_clusters, hotspot_centroids = find_hotspots_with_dbscan(
+        coords, eps=eps, min_samples=min_samples, approximate=approximate, algorithm=algorithm,
+        return_centroids=True
+    )
+    if not hotspot_clusters:
+        return CachedPlan([], np.empty((0, 2)), None, None, None)
+
+    # Generate probability density map and its rendering
+    prob_map = generate_density_map_from_data(coords, map_size=map_size, grid=density_grid)
+    prob_map_image = render_probability_map(prob_map, detailed=detailed, map_size=map_size,
+                                            image_format=image_format)
+
+    return CachedPlan(hotspot_clusters, hotspot_centroids, prob_map,
+                      f"{plan_id}-probability.{image_format}", prob_map_image)
+
+def _coordinate_dicts(points: np.ndarray) -> list:
+    return [{"x": x, "y": y} for x, y in points.tolist()]
+
+def _plan_hotspots(plan: CachedPlan) -> list:
+    """HotspotCluster-shaped dicts for a plan; only the List[Coordinate] endpoints need them."""
+    if plan.hotspots is None:
+        plan.hotspots = [
+            {
+                "centroid": {"x": float(centroid[0]), "y": float(centroid[1])},
+                "points": _coordinate_dicts(cluster),
+                "size": len(cluster)
+            }
+            for cluster, centroid in zip(plan.clusters, plan.centroids)
+        ]
+    return plan.hotspots
+
+def _cached_plan(coords: np.ndarray, eps: float, min_samples: int, map_size: Tuple[int, int],
+                 density_grid: Optional[Tuple[int, int]] = None, approximate: Optional[bool] = False,
+                 algorithm: str = 'dbscan', detailed: bool = False, image_format: str = 'png') -> CachedPlan:
+    """LRU-cached wrapper around _compute_plan keyed by a digest of the coordinates."""
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    digest = hashlib.blake2b(coords.tobytes(), digest_size=16).digest()
+    key = (digest, coords.shape, eps, min_samples, map_size, density_grid, approximate, algorithm,
+           detailed, image_format)
+
+    plan = _plan_cache.get(key)
+    if plan is None:
+        plan_id = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        plan = _compute_plan(coords, eps, min_samples, map_size, density_grid, approximate, algorithm,
+                             detailed, image_format, plan_id)
+        _plan_cache.put(key, plan)
+    return plan
+
+@lru_cache(maxsize=16)
+def _load_coords_cached(filepath: str, mtime: float) -> np.ndarray:
+    """Load CSV coordinates once per file modification time."""
+    return load_coords_from_csv(filepath)
 
 @app.get("/")
 def read_root():
@@ -59,81 +219,144 @@ def read_root():
         "description": "Generate optimized flight paths based on coordinate data using DBSCAN clustering",
         "endpoints": {
             "/generate-flight-plan": "POST - Generate flight plan from coordinates",
-            "/analyze-from-csv": "GET - Analyze coordinates from CSV file"
+            "/generate-flight-plan-fast": "POST - Same, with base64 float32 coordinate arrays",
+            "/analyze-from-csv": "GET - Analyze coordinates from CSV file",
+            "/plots/{image_name}": "GET - Fetch a rendered probability map or visualization"
+        }
+    }
+
+def _run_flight_plan(coords: np.ndarray, params: FlightPlanParams, inline: bool, detailed: bool,
+                     image_format: str):
+    """Shared body of the flight plan endpoints: clustering, path, and image fields."""
+    density_grid = tuple(params.density_grid) if params.density_grid else None
+    plan = _cached_plan(coords, params.eps, params.min_samples, tuple(params.map_size),
+                        density_grid, params.approximate, params.algorithm, detailed, image_format)
+    hotspot_clusters = plan.clusters
+
+    if not hotspot_clusters:
+        raise HTTPException(status_code=404, detail="No hotspots found. Try adjusting eps or min_samples parameters.")
+    
+    # Generate flight path
+    start_point = params.start_point or (
+        np.random.uniform(0, params.map_size[0]), 
+        np.random.uniform(0, params.map_size[1])
+    )
+    flight_path_array = plan_flight_path(plan.centroids, start_point=start_point)
+    
+    # Render the visualization unless this exact flight path was drawn already
+    visualization_id = hashlib.blake2b(
+        plan.prob_map_id.encode() + flight_path_array.tobytes(), digest_size=16
+    ).hexdigest() + f"-visualization.{image_format}"
+    visualization_image = _image_cache.get(visualization_id)
+    if visualization_image is None:
+        visualization_image = render_visualization(
+            plan.prob_map, hotspot_clusters, flight_path_array, coords,
+            detailed=detailed, map_size=params.map_size, image_format=image_format
+        )
+        _image_cache.put(visualization_id, visualization_image)
+    _image_cache.put(plan.prob_map_id, plan.prob_map_image)
+    
+    if inline:
+        images = {
+            "probability_map_base64": base64.b64encode(plan.prob_map_image).decode('utf-8'),
+            "visualization_base64": base64.b64encode(visualization_image).decode('utf-8')
+        }
+    else:
+        images = {
+            "probability_map_url": f"/plots/{plan.prob_map_id}",
+            "visualization_url": f"/plots/{visualization_id}"
         }
+    return plan, flight_path_array, images
+
+def _flight_plan_payload(request: FlightPlanRequest, inline: bool, detailed: bool,
+                         image_format: str = 'png') -> dict:
+    """Build the FlightPlanResponse body as plain dicts, skipping per-point model validation."""
+    # Convert input coordinates to numpy array
+    coords = np.array([[coord.x, coord.y] for coord in request.coordinates])
+    
+    if len(coords) == 0:
+        raise HTTPException(status_code=400, detail="No coordinates provided")
+    
+    plan, flight_path_array, images = _run_flight_plan(coords, request, inline, detailed, image_format)
+    hotspots_data = _plan_hotspots(plan)
+
+    payload = {
+        "flight_path": _coordinate_dicts(flight_path_array),
+        "hotspots": hotspots_data,
+        "num_hotspots": len(hotspots_data),
+        "probability_map_base64": None,
+        "visualization_base64": None,
+        "probability_map_url": None,
+        "visualization_url": None
     }
+    payload.update(images)
+    return payload
 
 @app.post("/generate-flight-plan", response_model=FlightPlanResponse)
-def generate_flight_plan(request: FlightPlanRequest):
+def generate_flight_plan(request: FlightPlanRequest, inline: bool = False, detailed: bool = False,
+                         image_format: FormatQuery = 'png'):
     """
     Generate an optimized flight plan from a set of coordinates.
     
     Args:
         request: FlightPlanRequest containing coordinates and parameters
+        inline: Embed the images as base64 instead of returning /plots URLs
+        detailed: Render the images with matplotlib (axes, colorbar, legend)
+        image_format: Image encoding, ?format=png|webp|jpeg
         
     Returns:
-        FlightPlanResponse with flight path, hotspots, and visualizations
+        FlightPlanResponse-shaped JSON with flight path, hotspots, and visualizations
     """
     try:
-        # Convert input coordinates to numpy array
-        coords = np.array([[coord.x, coord.y] for coord in request.coordinates])
+        payload = _flight_plan_payload(request, inline, detailed, image_format)
+        # Encoded directly, bypassing FastAPI's response_model validation pass
+        return Response(content=_encode_json(payload), media_type="application/json")
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating flight plan: {str(e)}")
+
+@app.post("/generate-flight-plan-fast", response_model=FlightPlanResponseFast)
+def generate_flight_plan_fast(request: FlightPlanRequestFast, inline: bool = False, detailed: bool = False,
+                              image_format: FormatQuery = 'png'):
+    """
+    Same as /generate-flight-plan, but coordinates travel as base64 float32 arrays.
+    
+    Args:
+        request: FlightPlanRequestFast with base64 coordinates and parameters
+        inline: Embed the images as base64 instead of returning /plots URLs
+        detailed: Render the images with matplotlib (axes, colorbar, legend)
+        image_format: Image encoding, ?format=png|webp|jpeg
+        
+    Returns:
+        FlightPlanResponseFast with base64 flight path and centroids, cluster sizes, and visualizations
+    """
+    try:
+        try:
+            buf = base64.b64decode(request.coords_b64, validate=True)
+        except binascii.Error:
+            raise HTTPException(status_code=400, detail="coords_b64 is not valid base64")
+        # Each (x, y) pair is two float32 values, 8 bytes
+        if len(buf) % 8 != 0:
+            raise HTTPException(status_code=400, detail="coords_b64 must hold float32 (x, y) pairs (a multiple of 8 bytes)")
+        coords = np.frombuffer(buf, dtype='<f4').reshape(-1, 2)
         
         if len(coords) == 0:
             raise HTTPException(status_code=400, detail="No coordinates provided")
         
-        # Find hotspots using DBSCAN
-        hotspot_clusters = find_hotspots_with_dbscan(
-            coords, 
-            eps=request.eps, 
-            min_samples=request.min_samples
-        )
-        
-        if not hotspot_clusters:
-            raise HTTPException(status_code=404, detail="No hotspots found. Try adjusting eps or min_samples parameters.")
-        
-        # Calculate centroids and prepare hotspot data
-        hotspot_centroids = []
-        hotspots_data = []
-        
-        for cluster in hotspot_clusters:
-            centroid = np.mean(cluster, axis=0)
-            hotspot_centroids.append(centroid)
-            
-            hotspots_data.append(HotspotCluster(
-                centroid=Coordinate(x=float(centroid[0]), y=float(centroid[1])),
-                points=[Coordinate(x=float(point[0]), y=float(point[1])) for point in cluster],
-                size=len(cluster)
-            ))
-        
-        # Generate flight path
-        hotspot_centroids_array = np.array(hotspot_centroids)
-        start_point = request.start_point or (
-            np.random.uniform(0, request.map_size[0]), 
-            np.random.uniform(0, request.map_size[1])
-        )
-        
-        flight_path_array = plan_flight_path(hotspot_centroids_array, start_point=start_point)
-        flight_path = [Coordinate(x=float(point[0]), y=float(point[1])) for point in flight_path_array]
+        plan, flight_path_array, images = _run_flight_plan(coords, request, inline, detailed, image_format)
         
-        # Generate probability density map
-        prob_map = generate_density_map_from_data(coords, map_size=request.map_size)
-        
-        # Generate base64 encoded probability map
-        prob_map_b64 = generate_probability_map_image(prob_map)
-        
-        # Generate base64 encoded visualization
-        visualization_b64 = generate_visualization_image(
-            prob_map, hotspot_clusters, flight_path_array, coords
-        )
-        
-        return FlightPlanResponse(
-            flight_path=flight_path,
-            hotspots=hotspots_data,
-            num_hotspots=len(hotspots_data),
-            probability_map_base64=prob_map_b64,
-            visualization_base64=visualization_b64
+        return FlightPlanResponseFast(
+            flight_path_b64=base64.b64encode(flight_path_array.astype('<f4').tobytes()).decode('ascii'),
+            centroids_b64=base64.b64encode(plan.centroids.astype('<f4').tobytes()).decode('ascii'),
+            cluster_sizes=[len(cluster) for cluster in plan.clusters],
+            num_hotspots=len(plan.clusters),
+            **images
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating flight plan: {str(e)}")
 
@@ -143,7 +366,10 @@ def analyze_from_csv(
     eps: float = 50.0,
     min_samples: int = 5,
     map_size_width: int = 2000,
-    map_size_height: int = 2000
+    map_size_height: int = 2000,
+    inline: bool = False,
+    detailed: bool = False,
+    image_format: FormatQuery = 'png'
 ):
     """
     Analyze coordinates from a CSV file and generate flight plan.
@@ -154,13 +380,16 @@ def analyze_from_csv(
         min_samples: DBSCAN minimum samples parameter
         map_size_width: Width of the probability map
         map_size_height: Height of the probability map
+        inline: Embed the images as base64 instead of returning /plots URLs
+        detailed: Render the images with matplotlib (axes, colorbar, legend)
+        image_format: Image encoding, ?format=png|webp|jpeg
         
     Returns:
         JSON response with flight plan data
     """
     try:
         # Load coordinates from CSV
-        coords = load_coords_from_csv(filepath)
+        coords = _load_coords_cached(filepath, os.path.getmtime(filepath))
         
         if len(coords) == 0:
             raise HTTPException(status_code=400, detail=f"No valid coordinates found in {filepath}")
@@ -175,51 +404,175 @@ def analyze_from_csv(
         )
         
         # Generate flight plan
-        return generate_flight_plan(request)
+        return generate_flight_plan(request, inline=inline, detailed=detailed, image_format=image_format)
     
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"CSV file {filepath} not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing CSV file: {str(e)}")
 
-def generate_probability_map_image(prob_map: np.ndarray) -> str:
-    """Generate base64 encoded probability map image."""
-    fig, ax = plt.subplots(figsize=(8, 8))
-    im = ax.imshow(prob_map, cmap='hot', origin='upper')
-    plt.colorbar(im, label='Probability')
+@app.get("/plots/{image_name}")
+def get_plot(image_name: str):
+    """Serve an image rendered by a previous flight plan request."""
+    image_bytes = _image_cache.get(image_name)
+    if image_bytes is None:
+        raise HTTPException(status_code=404, detail=f"Plot {image_name} not found or expired")
+    return Response(content=image_bytes, media_type=IMAGE_MEDIA_TYPES[image_name.rsplit('.', 1)[1]])
+
+def _colorize(prob_map: np.ndarray) -> np.ndarray:
+    """Map a 2D array through the 'hot' colormap into an RGB uint8 array."""
+    lo, hi = float(prob_map.min()), float(prob_map.max())
+    idx = ((prob_map - lo) * (255.0 / max(hi - lo, 1e-12))).astype(np.uint8)
+    return _HOT_LUT[idx]
+
+def _encode_image(img: Image.Image, image_format: str = 'png') -> bytes:
+    buffer = io.BytesIO()
+    if image_format == 'webp':
+        img.save(buffer, format='WEBP', quality=LOSSY_IMAGE_QUALITY, method=0)
+    elif image_format == 'jpeg':
+        img.convert('RGB').save(buffer, format='JPEG', quality=LOSSY_IMAGE_QUALITY)
+    else:
+        img.save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+# Per-thread matplotlib figures reused by the detailed renderers; sync endpoints
+# run on FastAPI's threadpool, so each worker thread keeps its own set
+_figure_local = threading.local()
+
+def _reusable_figure(name: str, figsize: Tuple[float, float]) -> list:
+    """Return this thread's cleared [fig, ax, colorbar_ax] for one plot type."""
+    figures = getattr(_figure_local, 'figures', None)
+    if figures is None:
+        figures = _figure_local.figures = {}
+    entry = figures.get(name)
+    if entry is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=figsize, dpi=150)
+        FigureCanvasAgg(fig)
+        entry = figures[name] = [fig, fig.add_subplot(), None]
+    else:
+        entry[1].clear()
+        if entry[2] is not None:
+            entry[2].clear()
+    return entry
+
+def _attach_colorbar(entry: list, im) -> None:
+    fig, ax, cax = entry
+    if cax is None:
+        entry[2] = fig.colorbar(im, ax=ax, label='Probability').ax
+    else:
+        fig.colorbar(im, cax=cax, label='Probability')
+
+def _save_figure(fig: "Figure", image_format: str = 'png') -> bytes:
+    if image_format != 'png':
+        # Encode the Agg RGBA buffer directly; skips savefig's second render and libpng
+        fig.canvas.draw()
+        return _encode_image(Image.fromarray(np.asarray(fig.canvas.buffer_rgba())), image_format)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight',
+                pil_kwargs={'compress_level': PNG_COMPRESS_LEVEL})
+    return buffer.getvalue()
+
+def _map_extent(prob_map: np.ndarray, map_size: Optional[Tuple[int, int]]) -> list:
+    """imshow extent placing prob_map over map coordinates, whatever its resolution."""
+    width, height = map_size if map_size is not None else prob_map.shape[::-1]
+    return [0, width, height, 0]
+
+def render_probability_map(prob_map: np.ndarray, detailed: bool = False,
+                           map_size: Optional[Tuple[int, int]] = None, image_format: str = 'png') -> bytes:
+    """Render the probability map to encoded image bytes, with matplotlib only when detailed."""
+    if not detailed:
+        return _encode_image(Image.fromarray(_colorize(prob_map)), image_format)
+
+    entry = _reusable_figure('probability', (8, 8))
+    fig, ax = entry[0], entry[1]
+    im = ax.imshow(prob_map, cmap='hot', origin='upper', extent=_map_extent(prob_map, map_size),
+                   interpolation='bilinear')
+    _attach_colorbar(entry, im)
     ax.set_title("Probability Density Map")
     ax.set_xlabel("X Coordinate")
     ax.set_ylabel("Y Coordinate")
     
-    # Save to base64
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-    plt.close(fig)
-    
-    return image_base64
+    return _save_figure(fig, image_format)
+
+def render_visualization(prob_map: np.ndarray, hotspot_clusters: list, 
+                         flight_path: np.ndarray, all_coords: np.ndarray,
+                         detailed: bool = False,
+                         map_size: Optional[Tuple[int, int]] = None, image_format: str = 'png') -> bytes:
+    """Render the flight plan visualization to encoded image bytes, with matplotlib only when detailed."""
+    if not detailed:
+        rgb = _colorize(prob_map)
+        h, w = rgb.shape[:2]
+        # Map coordinates -> pixels of a (possibly coarser) density grid
+        _, width, height, _ = _map_extent(prob_map, map_size)
+        scale = np.array([w / width, h / height])
+
+        # Original data points as 3x3 dots blended 50% with gray
+        pts = np.rint(all_coords * scale).astype(np.intp)
+        mask = np.zeros((h, w), dtype=bool)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                px, py = pts[:, 0] + dx, pts[:, 1] + dy
+                inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+                mask[py[inside], px[inside]] = True
+        rgb[mask] = (rgb[mask] >> 1) + 64
 
-def generate_visualization_image(prob_map: np.ndarray, hotspot_clusters: list, 
-                                flight_path: np.ndarray, all_coords: np.ndarray) -> str:
-    """Generate base64 encoded flight plan visualization."""
-    fig, ax = plt.subplots(figsize=(10, 8))
+        img = Image.fromarray(rgb)
+        draw = ImageDraw.Draw(img)
+
+        # Hotspot centroids
+        for cluster in hotspot_clusters:
+            cx, cy = np.mean(cluster, axis=0) * scale
+            draw.ellipse((cx - 6, cy - 6, cx + 6, cy + 6), fill='blue', outline='white', width=2)
+
+        # Flight path with waypoint markers and the start point
+        if len(flight_path) > 0:
+            path = [tuple(point) for point in (flight_path * scale).tolist()]
+            if len(path) > 1:
+                draw.line(path, fill='lime', width=3)
+            for x, y in path:
+                draw.regular_polygon((x, y, 6), 3, fill='lime')
+            sx, sy = path[0]
+            draw.rectangle((sx - 7, sy - 7, sx + 7, sy + 7), fill='green')
+
+        return _encode_image(img, image_format)
+
+    entry = _reusable_figure('visualization', (10, 8))
+    fig, ax = entry[0], entry[1]
+    extent = _map_extent(prob_map, map_size)
     
-    # Plot probability map
-    im = ax.imshow(prob_map, cmap='hot', origin='upper')
-    plt.colorbar(im, label='Probability')
+    if len(all_coords) <= DETAILED_SCATTER_MAX_POINTS:
+        # Plot probability map
+        im = ax.imshow(prob_map, cmap='hot', origin='upper', extent=extent, interpolation='bilinear')
+        _attach_colorbar(entry, im)
+
+        # Plot original data points
+        ax.scatter(all_coords[:, 0], all_coords[:, 1], color='gray', s=10, alpha=0.5, label='All Data Points')
+    else:
+        # Bin the points onto the map grid and alpha-blend them into the colorized
+        # map (alpha 0.5 per point, as the scatter would stack them), then draw
+        # one image instead of a path per point
+        from matplotlib.cm import ScalarMappable
+        from matplotlib.colors import Normalize
+        h, w = prob_map.shape
+        xi = np.clip((all_coords[:, 0] * (w / extent[1])).astype(np.intp), 0, w - 1)
+        yi = np.clip((all_coords[:, 1] * (h / extent[2])).astype(np.intp), 0, h - 1)
+        counts = np.bincount(yi * w + xi, minlength=h * w).reshape(h, w)
+        alpha = (1.0 - 0.5 ** counts.astype(np.float32))[..., None]
+        composite = _colorize(prob_map) * (1.0 - alpha) + 128.0 * alpha
+        ax.imshow(composite.astype(np.uint8), origin='upper', extent=extent, interpolation='nearest')
+        _attach_colorbar(entry, ScalarMappable(Normalize(prob_map.min(), prob_map.max()), cmap='hot'))
+        ax.scatter([], [], color='gray', s=10, alpha=0.5, label='All Data Points')
     ax.set_title("Flight Plan Over Probability Map")
     ax.set_xlabel("X Coordinate")
     ax.set_ylabel("Y Coordinate")
 
-    # Plot original data points
-    ax.scatter(all_coords[:, 0], all_coords[:, 1], color='gray', s=10, alpha=0.5, label='All Data Points')
-
     # Plot hotspot centroids
-    for cluster in hotspot_clusters:
-        centroid = np.mean(cluster, axis=0)
-        ax.scatter(centroid[0], centroid[1], color='blue', marker='o', s=100, 
-                  edgecolors='white', linewidths=1.5)
+    if hotspot_clusters:
+        centroids = np.array([np.mean(cluster, axis=0) for cluster in hotspot_clusters])
+        ax.scatter(centroids[:, 0], centroids[:, 1], color='blue', marker='o', s=100, 
+                   edgecolors='white', linewidths=1.5)
 
     # Plot flight path
     if len(flight_path) > 0:
@@ -231,14 +584,7 @@ def generate_visualization_image(prob_map: np.ndarray, hotspot_clusters: list,
     ax.legend()
     ax.grid(True, which='both', linestyle=':', linewidth=0.5)
     
-    # Save to base64
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-    plt.close(fig)
-    
-    return image_base64
+    return _save_figure(fig, image_format)
 
 @app.post("/generate-from-bbox")
 async def generate_from_bbox(
@@ -259,9 +605,12 @@ async def generate_from_bbox(
     Returns:
         Combined response with heatmap data and flight plan
     """
+    import requests
+
     try:
-        # Step 1: Get heatmap coordinates from MCS API
-        mcs_response = requests.post(
+        # Step 1: Get heatmap coordinates from MCS API (blocking I/O kept off the event loop)
+        mcs_response = await run_in_threadpool(
+            _mcs_session().post,
             f"{mcs_api_url}/generate-heatmap",
             json={"bbox": bbox},
             timeout=30
@@ -293,12 +642,12 @@ async def generate_from_bbox(
             map_size=(2000, 2000)  # Use consistent map size
         )
         
-        flight_plan_response = await generate_flight_plan(flight_plan_request)
+        flight_plan = await run_in_threadpool(_flight_plan_payload, flight_plan_request, False, False)
         
         # Step 4: Combine responses
         return {
             "heatmap": heatmap_data,
-            "flight_plan": flight_plan_response.dict(),
+            "flight_plan": flight_plan,
             "bbox": bbox,
             "workflow_complete": True
         }
@@ -1,16 +1,15 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from PIL import Image
-import random
+import os
 import time
-import requests
 import json
-from scipy.stats import gaussian_kde
-from scipy.interpolate import griddata
 import pickle
-import csv
 from numba import jit, njit
+import math
 from scipy.ndimage import map_coordinates
+from .elevation import (
+    ELEVATION_TILE_DIR, SENSE_WATER, SENSE_ROAD, SENSE_ELEVATION, SENSE_FLAT,
+    fetch_elevation_samples, histogram_kde_grid, sensing_map, sobel_gradient
+)
 
 # Configuration
 NUM_BOTS = 150
@@ -18,21 +17,31 @@ FPS = 30
 SPEED_RANGE = (1, 5)
 MARKER_SIZE = 15
 ALPHA = 0.6
+ANALYSIS_FIGURE_DPI = 150
 SIMULATION_TIME = 5
 ELEVATION_PREFERENCE = 0.65
 AGE_RANGE = (0.1, 1.0)
 AGE_SPEED_FACTOR = 2.0
 
 # Pre-computed terrain colors as numpy arrays
-TERRAIN_COLORS_ARRAY = np.array([
+TERRAIN_COLORS_RGB = np.array([
     [144, 238, 144],  # sparse_forest
     [0, 100, 0],      # dense_forest  
     [0, 102, 204],    # water
     [51, 51, 51]      # road
-]) / 255.0
+], dtype=np.int32)
+TERRAIN_COLORS_ARRAY = TERRAIN_COLORS_RGB / 255.0
 
 TERRAIN_NAMES = ['sparse_forest', 'dense_forest', 'water', 'road']
 
+# Bot color choices for the young (< 0.4), middle (< 0.7) and old age bands
+AGE_BAND_EDGES = np.array([0.4, 0.7])
+AGE_BAND_COLORS = np.array([
+    [[1.0, 0.0, 0.0], [1.0, 0.5, 0.0], [1.0, 1.0, 0.0]],
+    [[0.8, 0.2, 0.2], [0.8, 0.4, 0.1], [0.7, 0.7, 0.2]],
+    [[0.6, 0.3, 0.3], [0.6, 0.4, 0.2], [0.5, 0.5, 0.3]]
+])
+
 @njit
 def fast_closest_terrain(pixel_rgb):
     """Numba-optimized terrain classification"""
@@ -51,11 +60,18 @@ def fast_closest_terrain(pixel_rgb):
     
     return closest_idx
 
-@njit
+# Explicit signature: float32 maps and a uint8 sense map keep the lookups cache-resident.
+# Compiled eagerly at import, so the machine code is cached to disk for later imports
+@njit('void(f8[:, ::1], f8[::1], f8[::1], f8[::1], u1[:, ::1], f4[:, ::1], i8, i8, f8, f4[:, ::1])',
+      cache=True)
 def update_bots_vectorized(bot_positions, bot_angles, bot_speeds, bot_ages, 
-                          terrain_map, elevation_data, elevation_gradients,
-                          width, height, sensing_radius, elevation_preference):
-    """Highly optimized bot update using numba"""
+                          sense_map, target_angle_map,
+                          width, height, elevation_preference, rand_buf):
+    """Highly optimized bot update using numba
+
+    rand_buf holds (n_bots, 3) uniforms in [0, 1) drawn for the whole frame
+    outside the kernel, so no per-bot RNG calls happen inside the loop.
+    """
     n_bots = len(bot_positions)
     
     for i in range(n_bots):
@@ -63,26 +79,6 @@ def update_bots_vectorized(bot_positions, bot_angles, bot_speeds, bot_ages,
         x_int = max(0, min(width - 1, int(x)))
         y_int = max(0, min(height - 1, int(y)))
         
-        # Fast terrain sampling
-        x_min = max(0, x_int - sensing_radius)
-        x_max = min(width, x_int + sensing_radius + 1)
-        y_min = max(0, y_int - sensing_radius)  
-        y_max = min(height, y_int + sensing_radius + 1)
-        
-        # Count terrain types in sensing area
-        water_count = 0
-        road_count = 0
-        total_pixels = 0
-        
-        for yi in range(y_min, y_max):
-            for xi in range(x_min, x_max):
-                terrain_type = terrain_map[yi, xi]
-                total_pixels += 1
-                if terrain_type == 2:  # water
-                    water_count += 1
-                elif terrain_type == 3:  # road
-                    road_count += 1
-        
         # Age-based factors
         age_factor = bot_ages[i]
         angle_adjust_factor = 1.0 - (age_factor * 0.3)
@@ -92,35 +88,30 @@ def update_bots_vectorized(bot_positions, bot_angles, bot_speeds, bot_ages,
         # Decision making
         angle_adjust = 0.0
         
+        # The terrain reaction depends only on the pixel, so it is one byte lookup
+        sense = sense_map[y_int, x_int]
+        
         # Water edge following (simplified)
-        if water_count > 0 and water_count < total_pixels * 0.8:
+        if sense == SENSE_WATER:
             # Follow water edge - simplified version
-            if random.random() < 0.6:
-                angle_adjust += np.random.uniform(-0.5, 0.5) * angle_adjust_factor
+            if rand_buf[i, 0] < 0.6:
+                angle_adjust += (rand_buf[i, 1] - 0.5) * angle_adjust_factor
                 
         # Road following
-        elif road_count > water_count:
+        elif sense == SENSE_ROAD:
             angle_adjust += 0.3 * angle_adjust_factor
             
         # Elevation-based movement
-        elif random.random() < age_elev_pref:
-            grad_x = elevation_gradients[y_int, x_int, 0]
-            grad_y = elevation_gradients[y_int, x_int, 1]
+        elif sense == SENSE_ELEVATION and rand_buf[i, 0] < age_elev_pref:
+            angle_diff = target_angle_map[y_int, x_int] - bot_angles[i]
             
-            if abs(grad_x) > 0.1 or abs(grad_y) > 0.1:
-                target_angle = np.arctan2(-grad_y, -grad_x)  # Negative for downhill
-                angle_diff = target_angle - bot_angles[i]
-                
-                # Normalize angle difference
-                while angle_diff > np.pi:
-                    angle_diff -= 2 * np.pi
-                while angle_diff < -np.pi:
-                    angle_diff += 2 * np.pi
-                    
-                angle_adjust = angle_diff * 0.3 * angle_adjust_factor
+            # Constant-time wrap into [-pi, pi)
+            angle_diff -= 2.0 * math.pi * math.floor((angle_diff + math.pi) / (2.0 * math.pi))
+            
+            angle_adjust = angle_diff * 0.3 * angle_adjust_factor
         
         # Add random component
-        random_component = np.random.uniform(-0.03, 0.03) * (1.0 - age_factor * 0.5)
+        random_component = (rand_buf[i, 2] * 0.06 - 0.03) * (1.0 - age_factor * 0.5)
         bot_angles[i] += angle_adjust + random_component
         
         # Move bot
@@ -139,24 +130,12 @@ def update_bots_vectorized(bot_positions, bot_angles, bot_speeds, bot_ages,
             bot_positions[i, 1] = bot_positions[i, 1] - height
 
 def fetch_elevation_data_cached(lat_center, lon_center, width_pixels, height_pixels, 
-                               resolution_meters=30, cache_file=None):
-    """Optimized elevation fetching with caching"""
-    
-    # Try to load from cache first
-    if cache_file:
-        try:
-            cached_data = np.load(cache_file, allow_pickle=True).item()
-            if (cached_data['lat_center'] == lat_center and 
-                cached_data['lon_center'] == lon_center and
-                cached_data['width'] == width_pixels and
-                cached_data['height'] == height_pixels):
-                print("Using cached elevation data")
-                return cached_data['elevation']
-        except:
-            print("No valid cache found, fetching new data")
-    
-    print("Fetching elevation data...")
-    
+                               resolution_meters=30, cache_dir=ELEVATION_TILE_DIR):
+    """Optimized elevation fetching with caching
+
+    Samples come from the per-tile store shared with mcs2.py and anim.py,
+    so only points not seen before are fetched; pass cache_dir=None to skip it.
+    """
     # Reduced resolution for faster fetching
     grid_resolution = max(2, min(width_pixels, height_pixels) // 25)  # Even coarser grid
     
@@ -177,69 +156,27 @@ def fetch_elevation_data_cached(lat_center, lon_center, width_pixels, height_pix
     lats = np.linspace(lat_max, lat_min, height_pixels // grid_resolution)
     lons = np.linspace(lon_min, lon_max, width_pixels // grid_resolution)
     
-    elevation_points, locations = [], []
-    for i, lat in enumerate(lats):
-        for j, lon in enumerate(lons):
-            locations.append(f"{lat},{lon}")
-            elevation_points.append((j * grid_resolution, i * grid_resolution))
-    
-    # Larger batch size for fewer API calls
-    batch_size = 200  
-    all_elevations = []
+    # Concurrent batches paced by the shared token bucket; failed batches get
+    # random values and are left out of the cache
+    elev_grid_coarse = fetch_elevation_samples(lats, lons, cache_dir=cache_dir)
     
-    for i in range(0, len(locations), batch_size):
-        batch = locations[i:i+batch_size]
-        url = f"https://api.open-elevation.com/api/v1/lookup?locations={'|'.join(batch)}"
-        
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                elevations = [result['elevation'] for result in data['results']]
-                all_elevations.extend(elevations)
-                print(f"Fetched batch {i//batch_size + 1}")
-                time.sleep(0.3)  # Shorter delay
-            else:
-                all_elevations.extend(np.random.uniform(0, 100, len(batch)))
-        except:
-            all_elevations.extend(np.random.uniform(0, 100, len(batch)))
-    
-    if len(all_elevations) == len(elevation_points):
-        x_coords = [pt[0] for pt in elevation_points]
-        y_coords = [pt[1] for pt in elevation_points]
-        
-        xi, yi = np.arange(width_pixels), np.arange(height_pixels)
-        xi_grid, yi_grid = np.meshgrid(xi, yi)
-        
-        elevation_grid = griddata(
-            (x_coords, y_coords),
-            all_elevations,
-            (xi_grid, yi_grid),
-            method='linear',
-            fill_value=np.mean(all_elevations)
-        )
-        
-        # Cache the results
-        if cache_file:
-            cache_data = {
-                'lat_center': lat_center,
-                'lon_center': lon_center,
-                'width': width_pixels,
-                'height': height_pixels,
-                'elevation': elevation_grid
-            }
-            np.save(cache_file, cache_data)
-            print(f"Cached elevation data to {cache_file}")
-        
-        print(f"Elevation range: {np.min(elevation_grid):.1f}–{np.max(elevation_grid):.1f} m")
-        return elevation_grid
-    
-    print("Using random elevation fallback")
-    return np.random.uniform(0, 100, (height_pixels, width_pixels))
+    # Samples sit on a regular grid every grid_resolution pixels, so a
+    # bilinear resample replaces scattered-data triangulation
+    yy, xx = np.mgrid[0:height_pixels, 0:width_pixels].astype(np.float32)
+    elevation_grid = map_coordinates(
+        elev_grid_coarse,
+        [yy / grid_resolution, xx / grid_resolution],
+        order=1,
+        mode='nearest',
+        output=np.float32
+    )
+    print(f"Elevation range: {np.min(elevation_grid):.1f}–{np.max(elevation_grid):.1f} m")
+    return elevation_grid
 
 class OptimizedSwarmBot:
     def __init__(self, image_path='image.png', lat_center=40.7128, lon_center=-74.0060):
         # Load and process image
+        from PIL import Image
         self.image = Image.open(image_path).convert('RGB')
         self.width, self.height = self.image.size
         self.background = np.array(self.image)
@@ -249,22 +186,27 @@ class OptimizedSwarmBot:
         self.terrain_map = self._classify_terrain_vectorized()
         
         # Fetch elevation with caching
-        cache_file = f"elevation_cache_{lat_center}_{lon_center}_{self.width}x{self.height}.npy"
         self.elevation_data = fetch_elevation_data_cached(
-            lat_center, lon_center, self.width, self.height, cache_file=cache_file
+            lat_center, lon_center, self.width, self.height
         )
         
         # Pre-compute elevation gradients
         print("Computing elevation gradients...")
-        gy, gx = np.gradient(self.elevation_data)
-        self.elevation_gradients = np.stack([gx, gy], axis=-1)
+        gy, gx = sobel_gradient(self.elevation_data)
+        # Downhill direction and whether the slope is steep enough to follow are
+        # static, so the kernel reads them instead of taking atan2 per bot per frame
+        self.target_angle_map = np.arctan2(-gy, -gx).astype(np.float32)
+        self.grad_strong_mask = (np.abs(gx) > 0.1) | (np.abs(gy) > 0.1)
+        
+        # All per-bot randomness for a frame comes from one batched draw into rand_buf
+        self.rng = np.random.default_rng()
+        self.rand_buf = np.empty((NUM_BOTS, 3), dtype=np.float32)
         
         # Initialize bots as numpy arrays for better performance
         self.bot_positions = np.zeros((NUM_BOTS, 2))
         self.bot_angles = np.zeros(NUM_BOTS)
         self.bot_speeds = np.zeros(NUM_BOTS)
         self.bot_ages = np.zeros(NUM_BOTS)
-        self.bot_colors = []
         
         center_x, center_y = self.width // 2, self.height // 2
         
@@ -282,15 +224,10 @@ class OptimizedSwarmBot:
         speed_multipliers = AGE_SPEED_FACTOR * (1.1 - self.bot_ages)
         self.bot_speeds = base_speeds * speed_multipliers
         
-        # Generate colors based on age
-        for age in self.bot_ages:
-            if age < 0.4:
-                colors = [[1.0, 0.0, 0.0], [1.0, 0.5, 0.0], [1.0, 1.0, 0.0]]
-            elif age < 0.7:
-                colors = [[0.8, 0.2, 0.2], [0.8, 0.4, 0.1], [0.7, 0.7, 0.2]]
-            else:
-                colors = [[0.6, 0.3, 0.3], [0.6, 0.4, 0.2], [0.5, 0.5, 0.3]]
-            self.bot_colors.append(random.choice(colors))
+        # Colors based on age: one random pick from each bot's age band, as an (N, 3) array
+        age_bands = np.searchsorted(AGE_BAND_EDGES, self.bot_ages, side='right')
+        picks = self.rng.integers(0, AGE_BAND_COLORS.shape[1], NUM_BOTS)
+        self.bot_colors = AGE_BAND_COLORS[age_bands, picks]
     
     def _classify_terrain_vectorized(self):
         """Fast vectorized terrain classification"""
@@ -298,7 +235,6 @@ class OptimizedSwarmBot:
         
         # Process in chunks to avoid memory issues
         chunk_size = 1000
-        background_norm = self.background.astype(np.float32) / 255.0
         
         for y_start in range(0, self.height, chunk_size):
             y_end = min(y_start + chunk_size, self.height)
@@ -306,11 +242,12 @@ class OptimizedSwarmBot:
             for x_start in range(0, self.width, chunk_size):
                 x_end = min(x_start + chunk_size, self.width)
                 
-                chunk = background_norm[y_start:y_end, x_start:x_end]
+                # Distances are taken in 0..255 integer space, so the image is never normalized
+                chunk = self.background[y_start:y_end, x_start:x_end].astype(np.int32)
                 
                 # Vectorized distance calculation
                 for terrain_idx in range(4):
-                    terrain_color = TERRAIN_COLORS_ARRAY[terrain_idx]
+                    terrain_color = TERRAIN_COLORS_RGB[terrain_idx]
                     distances = np.sum((chunk - terrain_color)**2, axis=2)
                     
                     if terrain_idx == 0:
@@ -328,38 +265,44 @@ class OptimizedSwarmBot:
         print("Running optimized simulation...")
         total_frames = SIMULATION_TIME * FPS
         sensing_radius = 3
+        sense_map = sensing_map(self.terrain_map == 2, self.terrain_map == 3,
+                                self.grad_strong_mask, sensing_radius)
         
         # Progress tracking
         progress_interval = total_frames // 10
         
+        # Bind the kernel, its arguments and the RNG fill once; the frame loop does no
+        # attribute lookups of its own
+        step = update_bots_vectorized
+        fill_random = self.rng.random
+        rand_buf = self.rand_buf
+        step_args = (self.bot_positions, self.bot_angles, self.bot_speeds, self.bot_ages,
+                     sense_map, self.target_angle_map,
+                     self.width, self.height, ELEVATION_PREFERENCE, rand_buf)
+        
         for frame in range(total_frames):
             if frame % progress_interval == 0:
                 progress = (frame / total_frames) * 100
                 print(f"Progress: {progress:.1f}%")
             
             # Use numba-optimized update
-            update_bots_vectorized(
-                self.bot_positions, self.bot_angles, self.bot_speeds, self.bot_ages,
-                self.terrain_map, self.elevation_data, self.elevation_gradients,
-                self.width, self.height, sensing_radius, ELEVATION_PREFERENCE
-            )
+            fill_random(out=rand_buf, dtype=np.float32)
+            step(*step_args)
         
         print("Simulation complete!")
         self.create_density_map()
     
     def create_density_map(self):
         """Optimized density map creation"""
+        import matplotlib.pyplot as plt
         print("Creating analysis plots...")
         
         # Use lower resolution KDE for speed
-        x_grid = np.linspace(0, self.width, 80)  # Reduced from 100
-        y_grid = np.linspace(0, self.height, 80)
-        xx, yy = np.meshgrid(x_grid, y_grid)
-        grid_positions = np.vstack([xx.ravel(), yy.ravel()])
+        x_grid = np.linspace(0, self.width, 80, dtype=np.float32)  # Reduced from 100
+        y_grid = np.linspace(0, self.height, 80, dtype=np.float32)
         
-        # Fast KDE with automatic bandwidth
-        kde = gaussian_kde(self.bot_positions.T, bw_method='scott')
-        density = kde(grid_positions).reshape(80, 80)
+        # KDE by histogram smoothing with Scott's bandwidth
+        density = histogram_kde_grid(self.bot_positions.T, x_grid, y_grid)
         
         # Create visualization
         fig, axes = plt.subplots(2, 2, figsize=(16, 12))
@@ -379,8 +322,9 @@ class OptimizedSwarmBot:
         plt.colorbar(im1, ax=axes[0,1])
         
         # Elevation map
+        # Full-resolution elevation is downsampled onto the panel, so smoothing it adds nothing
         im2 = axes[1,0].imshow(self.elevation_data, extent=[0, self.width, self.height, 0],
-                              cmap='terrain', interpolation='bilinear')
+                              cmap='terrain', interpolation='nearest')
         axes[1,0].set_title('Elevation Map')
         plt.colorbar(im2, ax=axes[1,0])
         
@@ -396,7 +340,7 @@ class OptimizedSwarmBot:
         # Save efficiently
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         filename = f'optimized_swarm_analysis_{timestamp}.png'
-        fig.savefig(filename, dpi=200, bbox_inches='tight')  # Reduced DPI for speed
+        fig.savefig(filename, dpi=ANALYSIS_FIGURE_DPI, bbox_inches='tight')  # Reduced DPI for speed
         print(f"Saved: {filename}")
         
         # Save essential data only
@@ -408,12 +352,9 @@ class OptimizedSwarmBot:
         """Save only the most important data efficiently"""
         # Just save positions and density - skip redundant formats
         positions_file = f'positions_{timestamp}.csv'
-        with open(positions_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['x', 'y', 'age', 'speed'])
-            for i in range(NUM_BOTS):
-                writer.writerow([self.bot_positions[i, 0], self.bot_positions[i, 1], 
-                               self.bot_ages[i], self.bot_speeds[i]])
+        np.savetxt(positions_file,
+                   np.column_stack([self.bot_positions, self.bot_ages, self.bot_speeds]),
+                   delimiter=',', header='x,y,age,speed', comments='', fmt='%.6f')
         
         # Save density as compressed numpy array
         np.savez_compressed(f'density_{timestamp}.npz', 
@@ -426,7 +367,7 @@ if __name__ == "__main__":
         print(f"Starting optimized simulation with {NUM_BOTS} bots")
         print(f"Image processing and simulation for {SIMULATION_TIME} seconds...")
         
-        swarm = OptimizedSwarmBot('image.png', lat_center=40.7128, lon_center=-74.0060)
+        swarm = OptimizedSwarmBot(os.path.join(os.path.dirname(__file__), 'image.png'), lat_center=40.7128, lon_center=-74.0060)
         print(f"Image size: {swarm.width}x{swarm.height}")
         
         # Run simulation
@@ -1,7 +1,11 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from mcs import OptimizedSwarmBot, NUM_BOTS
+from .mcs import OptimizedSwarmBot, NUM_BOTS
 import json
+import os
+
+# Terrain image shipped next to this module
+IMAGE_PATH = os.path.join(os.path.dirname(__file__), 'image.png')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
@@ -24,20 +28,20 @@ def simulate_swarm():
             lon_center = float(request.args.get('lon_center', -74.0060))
         
         # Initialize simulation
-        simulation = OptimizedSwarmBot('image.png', lat_center=lat_center, lon_center=lon_center)
+        simulation = OptimizedSwarmBot(IMAGE_PATH, lat_center=lat_center, lon_center=lon_center)
         
         # Run simulation
         simulation.run_simulation()
         
         # Prepare CSV-like data
         bots_data = [
-            {
-                "x": float(simulation.bot_positions[i, 0]),
-                "y": float(simulation.bot_positions[i, 1]),
-                "age": float(simulation.bot_ages[i]),
-                "speed": float(simulation.bot_speeds[i])
-            }
-            for i in range(NUM_BOTS)
+            {"x": x, "y": y, "age": age, "speed": speed}
+            for x, y, age, speed in zip(
+                simulation.bot_positions[:, 0].tolist(),
+                simulation.bot_positions[:, 1].tolist(),
+                simulation.bot_ages.tolist(),
+                simulation.bot_speeds.tolist()
+            )
         ]
         
         return jsonify({
@@ -76,7 +80,7 @@ def generate_heatmap():
         lon_center = (east + west) / 2
         
         # Run simulation to generate potential search locations
-        simulation = OptimizedSwarmBot('image.png', lat_center=lat_center, lon_center=lon_center)
+        simulation = OptimizedSwarmBot(IMAGE_PATH, lat_center=lat_center, lon_center=lon_center)
         simulation.run_simulation()
         
         # Convert bot positions to coordinates within the bounding box
@@ -84,18 +88,22 @@ def generate_heatmap():
         x_scale = (east - west) / 2000  # Assuming 2000x2000 simulation space
         y_scale = (north - south) / 2000
         
-        heatmap_coords = []
-        for i in range(NUM_BOTS):
-            # Convert simulation coordinates to lat/lng
-            lng = west + (simulation.bot_positions[i, 0] * x_scale)
-            lat = south + (simulation.bot_positions[i, 1] * y_scale)
-            
-            heatmap_coords.append({
-                "x": float(lng),  # longitude as x
-                "y": float(lat),  # latitude as y
-                "intensity": float(simulation.bot_ages[i]),  # use age as intensity
-                "speed": float(simulation.bot_speeds[i])
-            })
+        # Convert simulation coordinates to lat/lng for all bots at once
+        lngs = west + simulation.bot_positions[:, 0] * x_scale
+        lats = south + simulation.bot_positions[:, 1] * y_scale
+        
+        heatmap_coords = [
+            {
+                "x": lng,  # longitude as x
+                "y": lat,  # latitude as y
+                "intensity": age,  # use age as intensity
+                "speed": speed
+            }
+            for lng, lat, age, speed in zip(
+                lngs.tolist(), lats.tolist(),
+                simulation.bot_ages.tolist(), simulation.bot_speeds.tolist()
+            )
+        ]
         
         return jsonify({
             "num_points": len(heatmap_coords),
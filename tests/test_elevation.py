@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from MCS import elevation
+
+
+def _reference_sense(terrain_map, grad_strong_mask, x, y, radius):
+    # Baseline per-bot sensing loop, evaluated at the pixel (x, y)
+    height, width = terrain_map.shape
+    patch = terrain_map[max(0, y - radius):min(height, y + radius + 1),
+                        max(0, x - radius):min(width, x + radius + 1)]
+    water_count, road_count = np.sum(patch == 2), np.sum(patch == 3)
+    if water_count > 0 and water_count < patch.size * 0.8:
+        return elevation.SENSE_WATER
+    if road_count > water_count:
+        return elevation.SENSE_ROAD
+    return elevation.SENSE_ELEVATION if grad_strong_mask[y, x] else elevation.SENSE_FLAT
+
+
+@pytest.mark.parametrize('radius', [1, 3])
+@pytest.mark.parametrize('seed', range(3))
+def test_sensing_map_matches_baseline(seed, radius):
+    rng = np.random.default_rng(seed)
+    terrain_map = rng.choice(4, size=(20, 27), p=[0.6, 0.1, 0.1, 0.2]).astype(np.uint8)
+    # A solid lake, so some windows are more than 80% water
+    terrain_map[5:14, 8:19] = 2
+    grad_strong_mask = rng.random(terrain_map.shape) < 0.5
+    sense_map = elevation.sensing_map(terrain_map == 2, terrain_map == 3, grad_strong_mask, radius)
+    expected = [[_reference_sense(terrain_map, grad_strong_mask, x, y, radius)
+                 for x in range(terrain_map.shape[1])] for y in range(terrain_map.shape[0])]
+    np.testing.assert_array_equal(sense_map, expected)
+
+
+def test_sobel_gradient_is_exact_on_a_plane():
+    ys, xs = np.mgrid[0:12, 0:15].astype(np.float32)
+    gy, gx = elevation.sobel_gradient(3 * xs - 2 * ys)
+    np.testing.assert_allclose(gx[1:-1, 1:-1], 3)
+    np.testing.assert_allclose(gy[1:-1, 1:-1], -2)
+
+
+def test_histogram_kde_matches_direct_kde():
+    # With every point on a grid node, binning is exact and only the kernel is discretised
+    x_grid, y_grid = np.linspace(0, 200, 101), np.linspace(0, 150, 76)
+    rng = np.random.default_rng(0)
+    values = np.stack([rng.choice(x_grid[30:70], 400), rng.choice(y_grid[25:50], 400)])
+    density = elevation.histogram_kde_grid(values, x_grid, y_grid)
+
+    bw = values.std(axis=1) * values.shape[1] ** (-1 / 6)
+    gx = np.exp(-0.5 * ((x_grid[:, None] - values[0]) / bw[0]) ** 2) / (np.sqrt(2 * np.pi) * bw[0])
+    gy = np.exp(-0.5 * ((y_grid[:, None] - values[1]) / bw[1]) ** 2) / (np.sqrt(2 * np.pi) * bw[1])
+    expected = gy @ gx.T / values.shape[1]
+    np.testing.assert_allclose(density, expected, rtol=0, atol=expected.max() * 1e-2)
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+
+from MCS import flightplan
+
+
+def _blobs(seed, centers=((200, 200), (800, 300), (500, 900)), per_blob=150, noise=30):
+    rng = np.random.default_rng(seed)
+    points = [rng.normal(center, 15, size=(per_blob, 2)) for center in centers]
+    points.append(rng.uniform(0, 1000, size=(noise, 2)))
+    return np.concatenate(points)
+
+
+def _reference_hotspots(coords, eps, min_samples):
+    # Baseline implementation: sklearn DBSCAN, one array per non-noise label
+    labels = DBSCAN(eps=eps, min_samples=min_samples).fit(coords).labels_
+    return [coords[labels == k] for k in sorted(set(labels)) if k != -1]
+
+
+def _reference_grid_labels(coords, eps, min_samples):
+    # Union-find over every pair of 8-adjacent occupied eps-sized cells
+    cells = [tuple(cell) for cell in np.floor(coords / eps).astype(np.int64).tolist()]
+    parent = {cell: cell for cell in cells}
+
+    def find(cell):
+        while parent[cell] != cell:
+            cell = parent[cell]
+        return cell
+
+    for x, y in parent:
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if (x + dx, y + dy) in parent:
+                    parent[find((x + dx, y + dy))] = find((x, y))
+    roots = [find(cell) for cell in cells]
+    sizes = {root: roots.count(root) for root in set(roots)}
+    return [root if sizes[root] >= min_samples else None for root in roots]
+
+
+def _canonical(clusters):
+    return sorted(sorted(map(tuple, np.asarray(cluster).tolist())) for cluster in clusters)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_dbscan_matches_baseline(seed):
+    coords = _blobs(seed)
+    expected = _canonical(_reference_hotspots(coords, 40, 5))
+    assert _canonical(flightplan.find_hotspots_with_dbscan(coords, eps=40, min_samples=5)) == expected
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_sklearn_fallback_matches_baseline(seed, monkeypatch):
+    monkeypatch.setattr(flightplan, 'FastDBSCAN', None)
+    coords = _blobs(seed)
+    # Duplicated points exercise the weighted unique-sample path
+    coords = np.concatenate([coords, coords[:40]])
+    expected = _canonical(_reference_hotspots(coords, 40, 5))
+    assert _canonical(flightplan.find_hotspots_with_dbscan(coords, eps=40, min_samples=5)) == expected
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_approximate_keeps_separated_clusters(seed):
+    coords = _blobs(seed, noise=0)
+    expected = _canonical(_reference_hotspots(coords, 40, 5))
+    assert _canonical(flightplan.find_hotspots_with_dbscan(coords, eps=40, min_samples=5,
+                                                           approximate=True)) == expected
+
+
+@pytest.mark.parametrize('max_cells', [flightplan.GRID_CLUSTER_MAX_CELLS, 0])
+@pytest.mark.parametrize('seed', range(3))
+def test_grid_clusters_match_reference(seed, max_cells, monkeypatch):
+    # max_cells=0 forces the hashed components path
+    monkeypatch.setattr(flightplan, 'GRID_CLUSTER_MAX_CELLS', max_cells)
+    coords = _blobs(seed)
+    roots = _reference_grid_labels(coords, 40, 5)
+    expected = _canonical(coords[[root == key for root in roots]]
+                          for key in set(roots) if key is not None)
+    hotspots = flightplan.find_hotspots_with_dbscan(coords, eps=40, min_samples=5, algorithm='grid')
+    assert _canonical(hotspots) == expected
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_grid_paths_number_components_alike(seed, monkeypatch):
+    coords = _blobs(seed)
+    dense = flightplan._grid_cluster_labels(coords, 40, 5)
+    monkeypatch.setattr(flightplan, 'GRID_CLUSTER_MAX_CELLS', 0)
+    np.testing.assert_array_equal(flightplan._grid_cluster_labels(coords, 40, 5), dense)
+
+
+def test_centroids_are_cluster_means():
+    coords = _blobs(0)
+    hotspots, centroids = flightplan.find_hotspots_with_dbscan(coords, eps=40, min_samples=5,
+                                                               return_centroids=True)
+    np.testing.assert_allclose(centroids, [cluster.mean(axis=0) for cluster in hotspots])
+
+
+def _reference_flight_path(waypoints, start_point):
+    # Baseline implementation: greedy nearest neighbour by a linear scan
+    flight_path = [start_point]
+    unvisited = list(range(len(waypoints)))
+    current_point = start_point
+    while unvisited:
+        nearest_index = min(unvisited, key=lambda i: np.hypot(*(waypoints[i] - current_point)))
+        current_point = waypoints[nearest_index]
+        flight_path.append(current_point)
+        unvisited.remove(nearest_index)
+    return np.array(flight_path)
+
+
+@pytest.mark.parametrize('count', [1, 7, 300])
+def test_flight_path_kernels_match_baseline(count):
+    rng = np.random.default_rng(count)
+    waypoints = rng.uniform(0, 2000, size=(count, 2))
+    expected = _reference_flight_path(waypoints, (0.0, 0.0))
+    np.testing.assert_array_equal(flightplan._plan_flight_path_nb(waypoints, 0.0, 0.0), expected)
+    np.testing.assert_array_equal(flightplan._plan_flight_path_kdtree(waypoints, 0.0, 0.0), expected)
+
+
+def test_plan_flight_path_empty():
+    np.testing.assert_array_equal(flightplan.plan_flight_path(np.empty((0, 2)), (3, 4)), [(3, 4)])
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from MCS import mcs2
+
+
+def _swarm(seed, height=24, width=31):
+    # Skip __init__: no image or elevation lookup, only the fields the force map reads
+    rng = np.random.default_rng(seed)
+    swarm = object.__new__(mcs2.SwarmBot)
+    swarm.height, swarm.width = height, width
+    swarm.terrain_map = rng.integers(0, 4, size=(height, width)).astype(np.uint8)
+    # Sparse water so some windows have none of it
+    swarm.terrain_map[(swarm.terrain_map == 2) & (rng.random((height, width)) < 0.9)] = 0
+    swarm.elevation_gradient = rng.normal(0, 1, size=(height, width, 2)).astype(np.float32)
+    return swarm
+
+
+def _reference_influence(swarm, x, y):
+    # Baseline _get_terrain_influence, evaluated at the pixel (x, y)
+    r = mcs2.TERRAIN_SAMPLE_RADIUS
+    x_min, x_max = max(0, x - r), min(swarm.width, x + r + 1)
+    y_min, y_max = max(0, y - r), min(swarm.height, y + r + 1)
+    patch = swarm.terrain_map[y_min:y_max, x_min:x_max]
+    force = np.zeros(2)
+    for label, weight in ((2, mcs2.RIVER_ATTRACTION), (3, mcs2.ROAD_ATTRACTION),
+                          (1, -mcs2.FOREST_AVOIDANCE)):
+        rows, cols = np.where(patch == label)
+        if len(rows):
+            angle = np.arctan2(rows.mean() + y_min - y, cols.mean() + x_min - x)
+            force += weight * np.array([np.cos(angle), np.sin(angle)])
+    grad = swarm.elevation_gradient[y, x].astype(np.float64)
+    return force - mcs2.ELEVATION_WEIGHT * grad / (np.linalg.norm(grad) + 1e-6)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_force_map_matches_baseline(seed):
+    swarm = _swarm(seed)
+    force_map = swarm._compute_force_map()
+    expected = np.array([[_reference_influence(swarm, x, y) for x in range(swarm.width)]
+                         for y in range(swarm.height)])
+    assert force_map.shape == expected.shape
+    np.testing.assert_allclose(force_map, expected, atol=1e-5)